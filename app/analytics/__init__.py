@@ -0,0 +1,4 @@
+from .parquet_archive import export_closed_months
+from .reports import load_metrics, expand_ranges, weekly_integration_engagement, platform_share_over_time
+
+__all__ = ['export_closed_months', 'load_metrics', 'expand_ranges', 'weekly_integration_engagement', 'platform_share_over_time']
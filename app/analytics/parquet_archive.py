@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.database.models import Workflow, PopularityMetric
+
+logger = logging.getLogger(__name__)
+
+# Columns stored in each file; platform and month come from the hive partition path
+SCHEMA = pa.schema([
+    ('metric_id', pa.int64()),
+    ('workflow_id', pa.int64()),
+    ('workflow_name', pa.string()),
+    ('country', pa.string()),
+    ('views', pa.int64()),
+    ('likes', pa.int64()),
+    ('comments', pa.int64()),
+    ('like_to_view_ratio', pa.float64()),
+    ('comment_to_view_ratio', pa.float64()),
+    ('engagement_score', pa.float64()),
+    ('replies', pa.int64()),
+    ('participants', pa.int64()),
+    ('search_volume', pa.int64()),
+    ('trend_direction', pa.string()),
+    ('growth_percentage', pa.float64()),
+    ('collected_at', pa.timestamp('us', tz='UTC')),
+    # End of the range an unchanged snapshot stood for, as of export
+    ('last_seen_at', pa.timestamp('us', tz='UTC')),
+])
+
+PARTITIONING = pa.schema([('platform', pa.string()), ('month', pa.string())])
+
+BATCH_ROWS = 50000
+
+def _month_bounds(month: Tuple[int, int]) -> Tuple[datetime, datetime]:
+    year, mon = month
+    start = datetime(year, mon, 1, tzinfo=timezone.utc)
+    end = datetime(year + (mon == 12), mon % 12 + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+def _month_key(month: Tuple[int, int]) -> str:
+    return f"{month[0]:04d}-{month[1]:02d}"
+
+def _closed_months(db: Session) -> List[Tuple[int, int]]:
+    """Months between the first snapshot and the current (still open) month"""
+    first = db.query(func.min(PopularityMetric.collected_at)).scalar()
+    if first is None:
+        return []
+
+    now = datetime.utcnow()
+    months = []
+    year, mon = first.year, first.month
+    while (year, mon) < (now.year, now.month):
+        months.append((year, mon))
+        year, mon = (year + 1, 1) if mon == 12 else (year, mon + 1)
+    return months
+
+def _last_seen(db: Session, month: Tuple[int, int]) -> Optional[datetime]:
+    """Latest end of any snapshot range that started in the month"""
+    start, end = _month_bounds(month)
+    value = db.query(
+        func.max(func.coalesce(PopularityMetric.last_seen_at, PopularityMetric.collected_at))
+    ).filter(
+        PopularityMetric.collected_at >= start,
+        PopularityMetric.collected_at < end
+    ).scalar()
+    if value is None:
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def export_month(db: Session, month: Tuple[int, int], root: Path) -> Dict[str, int]:
+    """Write one month of metric history as zstd Parquet, one file per platform"""
+    start, end = _month_bounds(month)
+    key = _month_key(month)
+
+    query = select(
+        PopularityMetric.id, Workflow.id, Workflow.workflow_name, Workflow.country,
+        PopularityMetric.views, PopularityMetric.likes, PopularityMetric.comments,
+        cast(PopularityMetric.like_to_view_ratio, Float),
+        cast(PopularityMetric.comment_to_view_ratio, Float),
+        cast(PopularityMetric.engagement_score, Float),
+        PopularityMetric.replies, PopularityMetric.participants, PopularityMetric.search_volume,
+        PopularityMetric.trend_direction,
+        cast(PopularityMetric.growth_percentage, Float),
+        PopularityMetric.collected_at,
+        func.coalesce(PopularityMetric.last_seen_at, PopularityMetric.collected_at),
+        Workflow.platform,
+    ).join(Workflow, PopularityMetric.workflow_id == Workflow.id).where(
+        PopularityMetric.collected_at >= start,
+        PopularityMetric.collected_at < end
+    ).order_by(Workflow.platform, PopularityMetric.collected_at)
+
+    writers: Dict[str, Tuple[pq.ParquetWriter, Path, Path]] = {}
+    counts: Dict[str, int] = {}
+
+    try:
+        result = db.execute(query.execution_options(yield_per=BATCH_ROWS))
+        for chunk in result.partitions():
+            by_platform: Dict[str, List[tuple]] = {}
+            for row in chunk:
+                by_platform.setdefault(row[-1], []).append(tuple(row[:-1]))
+
+            for platform, rows in by_platform.items():
+                if platform not in writers:
+                    path = root / f"platform={platform}" / f"month={key}" / "part-0.parquet"
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = path.with_name(f".part-0.{os.getpid()}.tmp")
+                    writer = pq.ParquetWriter(
+                        tmp_path, SCHEMA, compression='zstd', write_statistics=True
+                    )
+                    writers[platform] = (writer, tmp_path, path)
+
+                columns = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), SCHEMA)]
+                writers[platform][0].write_table(pa.Table.from_arrays(columns, schema=SCHEMA))
+                counts[platform] = counts.get(platform, 0) + len(rows)
+    except Exception:
+        for writer, tmp_path, _ in writers.values():
+            writer.close()
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    for writer, tmp_path, path in writers.values():
+        writer.close()
+        os.replace(tmp_path, path)
+
+    return counts
+
+def export_closed_months(db: Optional[Session] = None, root: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """Export every closed month that has not been archived yet
+
+    A month is marked done by ``_exported/<YYYY-MM>.json`` once all of its
+    platform files are in place, so re-runs skip it. Unchanged snapshots keep
+    extending their ``last_seen_at`` after export, so a month is exported
+    again while any range that started in it is still growing.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    root_path = Path(root or settings.parquet_archive_dir)
+    exported = {}
+
+    try:
+        for month in _closed_months(db):
+            key = _month_key(month)
+            marker = root_path / "_exported" / f"{key}.json"
+            last_seen = _last_seen(db, month)
+            if marker.exists():
+                exported_seen = json.loads(marker.read_text()).get('last_seen_at')
+                if last_seen is None or (exported_seen and datetime.fromisoformat(exported_seen) >= last_seen):
+                    continue
+
+            counts = export_month(db, month, root_path)
+            marker.parent.mkdir(parents=True, exist_ok=True)
+            marker.write_text(json.dumps({
+                'month': key,
+                'rows': counts,
+                'last_seen_at': last_seen.isoformat() if last_seen else None,
+                'exported_at': datetime.utcnow().isoformat()
+            }))
+            exported[key] = counts
+            logger.info(f"Exported {sum(counts.values())} metric rows for {key} to Parquet")
+    finally:
+        if own_session:
+            db.close()
+
+    return exported
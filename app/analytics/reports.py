@@ -0,0 +1,134 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from app.config import settings, POPULAR_INTEGRATIONS
+from .parquet_archive import SCHEMA, PARTITIONING
+
+def _dataset(root: Optional[str] = None) -> ds.Dataset:
+    root_path = Path(root or settings.parquet_archive_dir)
+    # Explicit schema so files written before a column was added read it as null
+    return ds.dataset(
+        root_path,
+        schema=pa.unify_schemas([SCHEMA, PARTITIONING]),
+        format='parquet',
+        partitioning=ds.partitioning(PARTITIONING, flavor='hive'),
+        exclude_invalid_files=True,
+        ignore_prefixes=['.', '_']
+    )
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def load_metrics(columns: List[str], start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 platforms: Optional[List[str]] = None, root: Optional[str] = None,
+                 ranges: bool = False) -> pa.Table:
+    """Scan archived metric history, pruning partitions and row groups by platform and time
+
+    With ``ranges``, ``start`` applies to the end of each snapshot's range
+    (``last_seen_at``), so snapshots that began earlier but still held at
+    ``start`` are included.
+    """
+    expression = None
+    conditions = []
+    if platforms:
+        conditions.append(ds.field('platform').isin(platforms))
+    if start and ranges:
+        since = pa.scalar(_utc(start), type=pa.timestamp('us', tz='UTC'))
+        conditions.append(
+            (ds.field('last_seen_at') >= since)
+            | (ds.field('last_seen_at').is_null() & (ds.field('collected_at') >= since))
+        )
+    elif start:
+        conditions.append(ds.field('collected_at') >= pa.scalar(_utc(start), type=pa.timestamp('us', tz='UTC')))
+    if end:
+        conditions.append(ds.field('collected_at') < pa.scalar(_utc(end), type=pa.timestamp('us', tz='UTC')))
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    return _dataset(root).to_table(columns=columns, filter=expression)
+
+def expand_ranges(df: pd.DataFrame, freq: str, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> pd.DataFrame:
+    """One row per workflow per period, holding the snapshot in effect at the end of the period
+
+    Unchanged re-collections only extend a snapshot's ``last_seen_at``, so a
+    snapshot stands for every period its range overlaps. Adds a ``period``
+    column (period start) and keeps periods overlapping [start, end).
+    """
+    if df.empty:
+        return df.assign(period=pd.Series(dtype='datetime64[us]'))
+
+    first = df['collected_at'].dt.tz_localize(None).dt.to_period(freq)
+    last = df['last_seen_at'].fillna(df['collected_at']).dt.tz_localize(None).dt.to_period(freq)
+    first_ordinals = first.array.asi8
+    spans = np.maximum(last.array.asi8 - first_ordinals, 0) + 1
+
+    rows = np.repeat(np.arange(len(df)), spans)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(spans) - spans, spans)
+    periods = pd.PeriodIndex.from_ordinals(first_ordinals[rows] + offsets, freq=first.dt.freq)
+
+    expanded = df.iloc[rows].reset_index(drop=True)
+    expanded['period'] = periods.start_time
+    keep = np.ones(len(expanded), dtype=bool)
+    if start:
+        keep &= periods.end_time >= _utc(start).replace(tzinfo=None)
+    if end:
+        keep &= periods.start_time < _utc(end).replace(tzinfo=None)
+
+    return expanded[keep].sort_values('collected_at').drop_duplicates(
+        ['workflow_id', 'period'], keep='last'
+    ).reset_index(drop=True)
+
+def weekly_integration_engagement(integrations: Optional[List[str]] = None, start: Optional[datetime] = None,
+                                  end: Optional[datetime] = None, root: Optional[str] = None) -> pd.DataFrame:
+    """Average engagement and total views per integration per week
+
+    Each workflow counts once per week with the snapshot in effect then
+    (see ``expand_ranges``). A workflow counts towards an integration when its
+    name mentions it (``google-sheets`` also matches "google sheets").
+    """
+    table = load_metrics(['workflow_id', 'workflow_name', 'platform', 'views', 'engagement_score',
+                          'collected_at', 'last_seen_at'], start=start, end=end, root=root, ranges=True)
+    df = expand_ranges(table.to_pandas(), 'W', start, end)
+    if df.empty:
+        return pd.DataFrame(columns=['week', 'integration', 'snapshots', 'views', 'avg_engagement'])
+
+    names = df['workflow_name'].str.lower()
+    df['week'] = df['period']
+
+    frames = []
+    for integration in integrations or POPULAR_INTEGRATIONS:
+        pattern = integration.lower().replace('-', '[- ]?')
+        matched = df[names.str.contains(pattern, regex=True, na=False)]
+        if matched.empty:
+            continue
+        grouped = matched.groupby('week').agg(
+            snapshots=('engagement_score', 'size'),
+            views=('views', 'sum'),
+            avg_engagement=('engagement_score', 'mean')
+        ).reset_index()
+        grouped.insert(1, 'integration', integration)
+        frames.append(grouped)
+
+    if not frames:
+        return pd.DataFrame(columns=['week', 'integration', 'snapshots', 'views', 'avg_engagement'])
+    return pd.concat(frames, ignore_index=True).sort_values(['week', 'integration'], ignore_index=True)
+
+def platform_share_over_time(metric: str = 'views', freq: str = 'W', start: Optional[datetime] = None,
+                             end: Optional[datetime] = None, root: Optional[str] = None) -> pd.DataFrame:
+    """Share of a metric contributed by each platform per period (rows: period, columns: platform)
+
+    Each workflow contributes its snapshot in effect in the period (see ``expand_ranges``).
+    """
+    table = load_metrics(['workflow_id', 'platform', metric, 'collected_at', 'last_seen_at'],
+                         start=start, end=end, root=root, ranges=True)
+    df = expand_ranges(table.to_pandas(), freq, start, end)
+    if df.empty:
+        return pd.DataFrame()
+
+    totals = df.pivot_table(index='period', columns='platform', values=metric, aggfunc='sum', fill_value=0)
+    return totals.div(totals.sum(axis=1).replace(0, 1), axis=0)
@@ -0,0 +1,94 @@
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+# Same thresholds the Trends collector uses for its snapshot direction
+RISING_GROWTH = 20.0
+DECLINING_GROWTH = -10.0
+
+def pack_interest(values: Sequence[float]) -> bytes:
+    """Pack a 0-100 interest series as one unsigned byte per point"""
+    return np.clip(np.rint(np.asarray(values, dtype=np.float64)), 0, 255).astype(np.uint8).tobytes()
+
+def unpack_interest(blob: bytes) -> np.ndarray:
+    """Inverse of ``pack_interest``"""
+    return np.frombuffer(blob, dtype=np.uint8)
+
+def stack(series: Sequence[np.ndarray]) -> np.ndarray:
+    """Right-align series into one float matrix, trimmed to the shortest length
+
+    Every feature looks back from the latest point, so series fetched over the
+    same timeframe line up on their most recent values.
+    """
+    if not series:
+        return np.empty((0, 0))
+    length = min(len(values) for values in series)
+    return np.vstack([np.asarray(values[len(values) - length:], dtype=np.float64) for values in series])
+
+def window_mean(matrix: np.ndarray, window: int, lag: int = 0) -> np.ndarray:
+    """Mean of ``window`` points ending ``lag`` points before the latest one, per row"""
+    end = matrix.shape[1] - lag
+    start = max(end - window, 0)
+    if end <= start:
+        return np.full(matrix.shape[0], np.nan)
+    return matrix[:, start:end].mean(axis=1)
+
+def rolling_growth(matrix: np.ndarray, window: int = 7, lag: Optional[int] = None) -> np.ndarray:
+    """Percent change of the latest ``window`` mean over the ``window`` mean ``lag`` points earlier
+
+    ``lag`` defaults to ``window`` (the immediately preceding window); a zero
+    baseline gives 0 growth.
+    """
+    recent = window_mean(matrix, window)
+    baseline = window_mean(matrix, window, window if lag is None else lag)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(baseline > 0, (recent - baseline) / baseline * 100, 0.0)
+    return np.round(growth, 2)
+
+def slope(matrix: np.ndarray, window: Optional[int] = None) -> np.ndarray:
+    """Least-squares slope in interest points per step over the last ``window`` points"""
+    y = matrix[:, -window:] if window else matrix
+    if y.shape[1] < 2:
+        return np.zeros(y.shape[0])
+    x = np.arange(y.shape[1], dtype=np.float64)
+    x -= x.mean()
+    return (y - y.mean(axis=1, keepdims=True)) @ x / (x @ x)
+
+def seasonality(matrix: np.ndarray, period: int = 7) -> np.ndarray:
+    """Share of detrended variance explained by a repeating ``period``-step profile (0-1)
+
+    The trend is a ``period``-point moving average; the profile is the mean
+    deviation at each phase of the cycle. Weekly search habits give values
+    near 1, noise near 0.
+    """
+    rows, length = matrix.shape
+    if period < 2 or length < 2 * period:
+        return np.zeros(rows)
+
+    cumsum = np.cumsum(np.pad(matrix, ((0, 0), (1, 0))), axis=1)
+    trend = (cumsum[:, period:] - cumsum[:, :-period]) / period
+    offset = period // 2
+    detrended = matrix[:, offset:offset + trend.shape[1]] - trend
+
+    cycles = detrended.shape[1] // period
+    profile = detrended[:, :cycles * period].reshape(rows, cycles, period).mean(axis=1)
+    total = detrended.var(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        strength = np.where(total > 0, profile.var(axis=1) / total, 0.0)
+    return np.clip(strength, 0.0, 1.0)
+
+def direction(growth: np.ndarray, rising: float = RISING_GROWTH, declining: float = DECLINING_GROWTH) -> np.ndarray:
+    """'rising', 'declining' or 'stable' per growth value"""
+    return np.where(growth > rising, "rising", np.where(growth < declining, "declining", "stable"))
+
+def trend_features(matrix: np.ndarray, growth_window: int = 7, growth_lag: Optional[int] = None,
+                   slope_window: Optional[int] = None, period: int = 7) -> Dict[str, np.ndarray]:
+    """All features for every row of ``matrix`` in one pass of array operations"""
+    growth = rolling_growth(matrix, growth_window, growth_lag)
+    return {
+        'mean_interest': np.round(matrix.mean(axis=1), 2) if matrix.size else np.zeros(matrix.shape[0]),
+        'latest_interest': matrix[:, -1] if matrix.size else np.zeros(matrix.shape[0]),
+        'growth_percentage': growth,
+        'slope': np.round(slope(matrix, slope_window), 4),
+        'seasonality': np.round(seasonality(matrix, period), 4),
+        'trend_direction': direction(growth)
+    }
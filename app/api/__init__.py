@@ -1,4 +1,4 @@
 from .routes import router
-from .models import WorkflowResponse, PopularityMetricsResponse, WorkflowListResponse
+from .models import WorkflowResponse, PopularityMetricsResponse, WorkflowListResponse, WorkflowHistoryResponse
 
-__all__ = ['router', 'WorkflowResponse', 'PopularityMetricsResponse', 'WorkflowListResponse']
+__all__ = ['router', 'WorkflowResponse', 'PopularityMetricsResponse', 'WorkflowListResponse', 'WorkflowHistoryResponse']
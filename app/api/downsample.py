@@ -0,0 +1,50 @@
+from typing import List, Sequence
+
+def lttb_indices(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last points and, from each of ``threshold - 2`` equal
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the average of the next bucket. Preserves the
+    visual shape of a series far better than uniform striding.
+    """
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 0)]
+
+    every = (n - 2) / (threshold - 2)
+    kept = [0]
+    a = 0
+
+    for i in range(threshold - 2):
+        # Average of the next bucket
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        count = max(next_end - next_start, 1)
+        avg_x = sum(xs[next_start:next_end]) / count if next_end > next_start else xs[n - 1]
+        avg_y = sum(ys[next_start:next_end]) / count if next_end > next_start else ys[n - 1]
+
+        # Pick the point in this bucket with the largest triangle area
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+
+        kept.append(best)
+        a = best
+
+    kept.append(n - 1)
+    return kept
+
+def bucket_bounds(n: int, points: int) -> List[range]:
+    """Split ``n`` ordered rows into at most ``points`` contiguous, near-equal buckets"""
+    if n == 0:
+        return []
+    points = min(points, n)
+    edges = [round(i * n / points) for i in range(points + 1)]
+    return [range(edges[i], edges[i + 1]) for i in range(points) if edges[i + 1] > edges[i]]
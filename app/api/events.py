@@ -0,0 +1,134 @@
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from app.config import settings
+from app.database import SessionLocal
+from app.database.models import CollectionLog
+from app.database.notify import NotificationListener
+from app.collectors import CollectedBatch, register_commit_listener
+from .leaderboard import leaderboards
+
+# Same ranking as /workflows/trending
+STREAM_METRIC = "normalized_score"
+
+class Broadcaster:
+    """In-process fan-out of change events to SSE and WebSocket subscribers
+
+    Collection events arrive either from Postgres LISTEN/NOTIFY (so every
+    worker sees runs committed anywhere) or, when no listener is running,
+    straight from the collector commit hook. Each event re-syncs the
+    leaderboards and is followed by one ``leaderboard`` event per board whose
+    top entries changed.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._listener: Optional[NotificationListener] = None
+        self._lock = threading.Lock()
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Bind to the server's event loop and start the cross-worker listener"""
+        self._loop = loop
+        if settings.enable_event_listener and settings.database_url.startswith("postgres"):
+            self._listener = NotificationListener(self.handle_collection_event)
+            self._listener.start()
+
+    def stop(self):
+        if self._listener:
+            self._listener.stop()
+            self._listener = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=settings.stream_queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event: Dict[str, Any]):
+        """Queue an event for every subscriber; safe to call from any thread"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._fan_out, event)
+
+    def _fan_out(self, event: Dict[str, Any]):
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Slow consumer: drop its oldest event rather than block everyone
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def on_commit(self, platform: str, log_id: int, batch: CollectedBatch):
+        """Commit hook used when no NOTIFY listener delivers the event"""
+        if self._listener is None:
+            self.handle_collection_event({
+                "type": "collection",
+                "platform": platform,
+                "log_id": log_id,
+                "countries": sorted(set(batch.countries))
+            })
+
+    def handle_collection_event(self, event: Dict[str, Any]):
+        """Publish a collection event and the top-K entries it changed"""
+        if not self._subscribers:
+            # Nobody listening; leaderboards re-sync on the next read anyway
+            return
+
+        with self._lock:
+            db = SessionLocal()
+            try:
+                log = db.query(CollectionLog).filter(CollectionLog.id == event.get("log_id")).first()
+                if log:
+                    event = dict(
+                        event,
+                        status=log.status,
+                        workflows_collected=log.workflows_collected,
+                        completed_at=log.completed_at
+                    )
+
+                depth = settings.stream_top_k
+                before = leaderboards.snapshot(STREAM_METRIC, depth)
+                leaderboards.refresh(db)
+                after = leaderboards.snapshot(STREAM_METRIC, depth)
+            finally:
+                db.close()
+
+        self.publish(event)
+        for change in self._board_changes(before, after):
+            self.publish(change)
+
+    @staticmethod
+    def _board_changes(before, after) -> List[Dict[str, Any]]:
+        def ranking(entries):
+            return [(e["workflow_id"], e["popularity_metrics"][STREAM_METRIC]) for e in entries]
+
+        changes = []
+        for (platform, country), entries in after.items():
+            if ranking(entries) == ranking(before.get((platform, country), [])):
+                continue
+            changes.append({
+                "type": "leaderboard",
+                "platform": platform,
+                "country": country,
+                "metric": STREAM_METRIC,
+                "entries": [
+                    {
+                        "rank": rank,
+                        "workflow_id": e["workflow_id"],
+                        "workflow": e["workflow"],
+                        "platform": e["platform"],
+                        "country": e["country"],
+                        STREAM_METRIC: e["popularity_metrics"][STREAM_METRIC],
+                        "collected_at": e["collected_at"]
+                    }
+                    for rank, e in enumerate(entries, start=1)
+                ],
+                "updated_at": datetime.utcnow()
+            })
+        return changes
+
+broadcaster = Broadcaster()
+register_commit_listener(broadcaster.on_commit)
@@ -0,0 +1,186 @@
+import heapq
+import time
+import threading
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.models import Workflow, PopularityMetric, CollectionLog, latest_metric_ids
+from app.collectors import CollectedBatch, register_commit_listener
+from app.collectors.batch import METRIC_FIELDS
+
+# Sort keys served from memory; anything else falls back to SQL
+METRICS = ('normalized_score', 'engagement_score', 'views', 'likes', 'comments')
+
+BoardKey = Tuple[Optional[str], Optional[str], str]
+
+def _plain(value: Any) -> Any:
+    """Convert Numeric columns to floats so entries are JSON-ready"""
+    return float(value) if isinstance(value, Decimal) else value
+
+def _sort_value(entry: Dict[str, Any], metric: str) -> float:
+    value = entry['popularity_metrics'].get(metric)
+    return float(value) if value is not None else 0.0
+
+def _board_keys(entry: Dict[str, Any]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """Every (platform, country) scope an entry is ranked in; None means 'all'"""
+    platform, country = entry['platform'], entry['country']
+    return [(None, None), (platform, None), (None, country), (platform, country)]
+
+class Leaderboards:
+    """In-process top-K leaderboards per (platform, country, metric)
+
+    Boards hold the latest snapshot of each workflow. They are merged
+    incrementally when a collection commits in this process, rebuilt from SQL
+    when another worker bumps the data generation (the newest completed
+    ``collection_logs`` id), and swapped atomically so readers never lock.
+    """
+
+    def __init__(self, size: Optional[int] = None, sync_seconds: Optional[float] = None):
+        self.size = size or settings.leaderboard_size
+        self.sync_seconds = settings.leaderboard_sync_seconds if sync_seconds is None else sync_seconds
+        self._boards: Optional[Dict[BoardKey, List[Dict[str, Any]]]] = None
+        self._totals: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+        self._generation: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def top(self, db: Session, metric: str, platform: Optional[str] = None,
+            country: Optional[str] = None, limit: int = 20) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+        """Return (total, entries) from memory, or None when the caller should use SQL"""
+        if metric not in METRICS or limit > self.size:
+            return None
+
+        self._sync(db)
+        boards = self._boards
+        if boards is None:
+            return None
+
+        entries = boards.get((platform, country, metric), [])
+        return self._totals.get((platform, country), 0), entries[:limit]
+
+    def refresh(self, db: Session):
+        """Check the data generation now instead of waiting for ``sync_seconds``"""
+        self._checked_at = 0.0
+        self._sync(db)
+
+    def snapshot(self, metric: str, depth: int) -> Dict[Tuple[Optional[str], Optional[str]], List[Dict[str, Any]]]:
+        """Top ``depth`` entries of every board for a metric, keyed by (platform, country)"""
+        boards = self._boards or {}
+        return {
+            (platform, country): entries[:depth]
+            for (platform, country, board_metric), entries in boards.items()
+            if board_metric == metric
+        }
+
+    def ingest(self, platform: str, log_id: int, batch: CollectedBatch):
+        """Merge freshly committed collection items into the boards"""
+        if not len(batch) or self._boards is None:
+            return
+
+        # Rows whose save failed have no workflow id and are not in the database.
+        # An item can appear several times (e.g. a video found under several
+        # keywords); its last row is the one in effect.
+        latest: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        for i in range(len(batch)):
+            if not batch.workflow_ids[i]:
+                continue
+            entry = dict(self._entry_from_item(batch.item(i), batch.collected_at[i]), workflow_id=batch.workflow_ids[i])
+            entry['popularity_metrics']['normalized_score'] = batch.scores[i]
+            latest[self._identity(entry)] = entry
+        if not latest:
+            return
+        entries = list(latest.values())
+        identities = set(latest)
+
+        with self._lock:
+            boards = dict(self._boards)
+            touched = {scope for entry in entries for scope in _board_keys(entry)}
+
+            for scope in touched:
+                fresh = [e for e in entries if scope in _board_keys(e)]
+                for metric in METRICS:
+                    key = (scope[0], scope[1], metric)
+                    kept = [e for e in boards.get(key, []) if self._identity(e) not in identities]
+                    boards[key] = heapq.nlargest(
+                        self.size, kept + fresh, key=lambda e: _sort_value(e, metric)
+                    )
+
+            self._boards = boards
+
+    def rebuild(self, db: Session):
+        """Rebuild every board from the latest snapshot of each workflow"""
+        rows = db.query(Workflow, PopularityMetric).join(PopularityMetric).filter(
+            PopularityMetric.id.in_(latest_metric_ids())
+        ).all()
+
+        buckets: Dict[Tuple[Optional[str], Optional[str]], List[Dict[str, Any]]] = {}
+        for workflow, metric in rows:
+            entry = self._entry_from_row(workflow, metric)
+            for scope in _board_keys(entry):
+                buckets.setdefault(scope, []).append(entry)
+
+        boards = {}
+        for scope, entries in buckets.items():
+            for metric_name in METRICS:
+                boards[(scope[0], scope[1], metric_name)] = heapq.nlargest(
+                    self.size, entries, key=lambda e: _sort_value(e, metric_name)
+                )
+
+        self._totals = {scope: len(entries) for scope, entries in buckets.items()}
+        self._boards = boards
+
+    def _sync(self, db: Session):
+        """Rebuild when the data generation moved; checked at most every ``sync_seconds``"""
+        now = time.monotonic()
+        if self._boards is not None and now - self._checked_at < self.sync_seconds:
+            return
+
+        with self._lock:
+            if self._boards is not None and now - self._checked_at < self.sync_seconds:
+                return
+            try:
+                generation = db.query(func.max(CollectionLog.id)).filter(
+                    CollectionLog.completed_at.isnot(None)
+                ).scalar()
+                if self._boards is None or generation != self._generation:
+                    self.rebuild(db)
+                    self._generation = generation
+                self._checked_at = now
+            except Exception as e:
+                print(f"Error syncing leaderboards: {e}")
+
+    @staticmethod
+    def _identity(entry: Dict[str, Any]) -> Tuple[str, str, str]:
+        return entry['platform'], entry['platform_id'], entry['country']
+
+    @staticmethod
+    def _entry_from_row(workflow: Workflow, metric: PopularityMetric) -> Dict[str, Any]:
+        return {
+            "workflow_id": workflow.id,
+            "workflow": workflow.workflow_name,
+            "platform": workflow.platform,
+            "platform_id": workflow.platform_id,
+            "popularity_metrics": {
+                field: _plain(getattr(metric, field)) for field in METRIC_FIELDS + ('normalized_score',)
+            },
+            "country": workflow.country,
+            "collected_at": metric.collected_at
+        }
+
+    @staticmethod
+    def _entry_from_item(item: Dict[str, Any], collected_at: datetime) -> Dict[str, Any]:
+        metrics = item['metrics']
+        return {
+            "workflow": item['workflow_name'],
+            "platform": item['platform'],
+            "platform_id": item['platform_id'],
+            "popularity_metrics": {field: _plain(metrics.get(field)) for field in METRIC_FIELDS},
+            "country": item['country'],
+            "collected_at": collected_at
+        }
+
+leaderboards = Leaderboards()
+register_commit_listener(leaderboards.ingest)
@@ -15,12 +15,14 @@ class PopularityMetricsResponse(BaseModel):
     search_volume: Optional[int] = None
     trend_direction: Optional[str] = None
     growth_percentage: Optional[float] = None
+    normalized_score: Optional[float] = None
     
     class Config:
         from_attributes = True
 
 class WorkflowResponse(BaseModel):
     """Response model for a single workflow"""
+    workflow_id: Optional[int] = None
     workflow: str
     platform: str
     popularity_metrics: PopularityMetricsResponse
@@ -37,6 +39,60 @@ class WorkflowListResponse(BaseModel):
     offset: int
     workflows: List[WorkflowResponse]
 
+class WorkflowBatchRequest(BaseModel):
+    """Request model for batch workflow lookup"""
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+class WorkflowBatchResponse(BaseModel):
+    """Response model for batch workflow lookup"""
+    workflows: List[WorkflowResponse]
+    missing: List[int]
+
+class HistoryPoint(BaseModel):
+    """One point of a downsampled metric series"""
+    collected_at: datetime
+    views: Optional[float] = None
+    likes: Optional[float] = None
+    comments: Optional[float] = None
+    engagement_score: Optional[float] = None
+    search_volume: Optional[float] = None
+
+class WorkflowHistoryResponse(BaseModel):
+    """Response model for a workflow's metric history"""
+    workflow_id: int
+    workflow: str
+    platform: str
+    country: Optional[str] = None
+    method: str
+    total_points: int
+    points: List[HistoryPoint]
+
+class TrendFeatures(BaseModel):
+    """Features of one stored Google Trends interest series"""
+    workflow_id: int
+    keyword: str
+    country: Optional[str] = None
+    start_at: datetime
+    interval_seconds: int
+    points: int
+    is_partial: bool
+    collected_at: Optional[datetime] = None
+    mean_interest: float
+    latest_interest: float
+    growth_percentage: float
+    slope: float
+    seasonality: float
+    trend_direction: str
+
+class TrendFeaturesListResponse(BaseModel):
+    """Response model for trend features across keywords"""
+    total: int
+    trends: List[TrendFeatures]
+
+class TrendSeriesResponse(TrendFeatures):
+    """Response model for one keyword's full interest series and its features"""
+    interest: List[int]
+
 class StatsResponse(BaseModel):
     """Response model for statistics"""
     total_workflows: int
@@ -0,0 +1,99 @@
+import asyncio
+import functools
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import parse_qs
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+from app.config import settings
+from app.profiling import Profile
+
+# Profile of the current request, set by the middleware when profiling was asked for
+_current: ContextVar[Optional[Profile]] = ContextVar("request_profile", default=None)
+
+def _profiled(endpoint: Callable) -> Callable:
+    """Wrap an endpoint so it runs under the request's profile, if any
+
+    Sync endpoints run in the threadpool and cProfile only sees the thread
+    that enables it, so profiling has to start inside the endpoint call
+    rather than in the middleware.
+    """
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            with profile:
+                return await endpoint(*args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return endpoint(*args, **kwargs)
+            with profile:
+                return endpoint(*args, **kwargs)
+    return wrapper
+
+class ProfiledRoute(APIRoute):
+    """Route class whose endpoint can be profiled per request"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+class ProfilingMiddleware:
+    """Profile requests sent with ``X-Profile: 1`` or ``?profile=1`` and a valid ``X-Admin-Key``
+
+    The profile is saved under ``PROFILE_DIR/requests``; the response names the
+    file in ``X-Profile`` and reports the HTTP/DB/sleep/processing split in
+    ``Server-Timing``. Other requests pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        admin_key = headers.get(b"x-admin-key", b"").decode()
+        if not admin_key or admin_key not in settings.admin_api_key_list:
+            response = ORJSONResponse({"detail": "Profiling requires an admin key"}, status_code=403)
+            await response(scope, receive, send)
+            return
+
+        profile = Profile()
+        token = _current.set(profile)
+        path = Path(settings.profile_dir) / "requests" / (
+            f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{scope['method']}"
+            f"{scope['path'].replace('/', '_')}.prof"
+        )
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                # The endpoint has returned by now, so its profile is complete
+                totals = profile.save(path)
+                timing = ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile", path.name.encode()),
+                    (b"server-timing", timing.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _current.reset(token)
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile" and value not in (b"", b"0"):
+                return True
+        query = parse_qs(scope.get("query_string", b"").decode())
+        return query.get("profile", ["0"])[0] not in ("", "0")
@@ -1,18 +1,73 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func
 from typing import Optional, List
-from datetime import datetime
-from app.database import get_db
-from app.database.models import Workflow, PopularityMetric, CollectionLog
-from app.collectors import YouTubeCollector, ForumCollector, TrendsCollector
+from datetime import datetime, timezone
+from app.database import get_db, get_read_db
+from app.database.models import Workflow, PopularityMetric, CollectionLog, TrendSeries, latest_metric_ids, latest_series_ids
+from app.analytics.trend_features import unpack_interest, stack, trend_features
+from app.collectors import YouTubeCollector, ForumCollector, TrendsCollector, RawArchive, EntityCache
 from app.config import settings
+from .downsample import lttb_indices, bucket_bounds
+from .serialization import WORKFLOW_COLUMNS, dumps, row_to_workflow, stream_json_array, stream_ndjson
+from .events import broadcaster
+from .profiling import ProfiledRoute
+from .leaderboard import leaderboards
 from .models import (
     WorkflowResponse, WorkflowListResponse, StatsResponse,
-    CollectRequest, HealthResponse, PopularityMetricsResponse
+    CollectRequest, HealthResponse, PopularityMetricsResponse,
+    WorkflowBatchRequest, WorkflowBatchResponse, WorkflowHistoryResponse,
+    TrendFeaturesListResponse, TrendSeriesResponse
 )
 
-router = APIRouter(prefix="/api/v1", tags=["workflows"])
+router = APIRouter(prefix="/api/v1", tags=["workflows"], route_class=ProfiledRoute)
+
+def _workflow_query(db: Session, platform: Optional[str], country: Optional[str]):
+    """Plain-column query over workflows joined with their metric snapshots"""
+    query = db.query(*WORKFLOW_COLUMNS).select_from(Workflow).join(PopularityMetric)
+    
+    if platform:
+        query = query.filter(Workflow.platform == platform)
+    if country:
+        query = query.filter(Workflow.country == country)
+    
+    return query
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def _expand_snapshots(rows, start: Optional[datetime], end: Optional[datetime]):
+    """Turn (collected_at, last_seen_at, *values) ranges into points inside [start, end)
+
+    A snapshot that stayed unchanged until ``last_seen_at`` yields a second
+    point there, so the series is flat across the range as if every
+    re-collection had been stored.
+    """
+    start = _utc(start) if start else None
+    end = _utc(end) if end else None
+    
+    points = []
+    for collected_at, last_seen_at, *values in rows:
+        first = _utc(collected_at)
+        if start and first < start:
+            first = start
+        points.append((first, *values))
+        
+        last = _utc(last_seen_at or collected_at)
+        if last > first and (end is None or last < end):
+            points.append((last, *values))
+    return points
+
+def _apply_sort(query, sort_by: str, order: str):
+    sort_column = getattr(PopularityMetric, sort_by, PopularityMetric.engagement_score)
+    if order == "desc":
+        # Unscored snapshots (not backfilled yet) go last, matching idx_metrics_normalized
+        if sort_by == "normalized_score":
+            return query.order_by(desc(sort_column).nulls_last())
+        return query.order_by(desc(sort_column))
+    return query.order_by(sort_column)
 
 @router.get("/workflows", response_model=WorkflowListResponse)
 def get_workflows(
@@ -22,78 +77,83 @@ def get_workflows(
     offset: int = Query(0, ge=0),
     sort_by: str = Query("engagement_score", description="Sort field"),
     order: str = Query("desc", description="Sort order"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all workflows with pagination and filtering"""
     
-    # Build query
-    query = db.query(Workflow, PopularityMetric).join(PopularityMetric)
-    
-    if platform:
-        query = query.filter(Workflow.platform == platform)
-    if country:
-        query = query.filter(Workflow.country == country)
+    # Build query over plain columns; rows skip ORM hydration and model validation
+    query = _workflow_query(db, platform, country)
     
     # Get total count
     total = query.count()
     
-    # Apply sorting
-    sort_column = getattr(PopularityMetric, sort_by, PopularityMetric.engagement_score)
-    if order == "desc":
-        query = query.order_by(desc(sort_column))
-    else:
-        query = query.order_by(sort_column)
-    
-    # Apply pagination
-    results = query.offset(offset).limit(limit).all()
+    # Apply sorting and pagination
+    results = _apply_sort(query, sort_by, order).offset(offset).limit(limit).all()
     
-    # Format response
-    workflows = []
-    for workflow, metric in results:
-        workflows.append({
-            "workflow": workflow.workflow_name,
-            "platform": workflow.platform,
-            "popularity_metrics": metric,
-            "country": workflow.country,
-            "collected_at": metric.collected_at
-        })
-    
-    return {
+    return ORJSONResponse({
         "total": total,
         "limit": limit,
         "offset": offset,
-        "workflows": workflows
-    }
+        "workflows": [row_to_workflow(row) for row in results]
+    })
 
-@router.get("/workflows/{platform}", response_model=WorkflowListResponse)
-def get_workflows_by_platform(
-    platform: str,
-    country: Optional[str] = None,
-    limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db)
+@router.get("/workflows/export")
+def export_workflows(
+    platform: Optional[str] = Query(None, description="Filter by platform"),
+    country: Optional[str] = Query(None, description="Filter by country"),
+    limit: int = Query(10000, ge=1, le=settings.export_max_rows),
+    sort_by: str = Query("engagement_score", description="Sort field"),
+    order: str = Query("desc", description="Sort order"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json or ndjson"),
+    db: Session = Depends(get_read_db)
 ):
-    """Get workflows from specific platform"""
-    return get_workflows(platform=platform, country=country, limit=limit, offset=offset, db=db)
+    """Stream a large list of workflow snapshots without building it in memory"""
+    
+    query = _apply_sort(_workflow_query(db, platform, country), sort_by, order).limit(limit)
+    rows = db.execute(query.statement.execution_options(yield_per=1000))
+    
+    if format == "ndjson":
+        return StreamingResponse(stream_ndjson(rows), media_type="application/x-ndjson")
+    return StreamingResponse(
+        stream_json_array(rows, {"limit": limit}, "workflows"),
+        media_type="application/json"
+    )
 
 @router.get("/workflows/trending", response_model=WorkflowListResponse)
 def get_trending_workflows(
     country: Optional[str] = None,
+    platform: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    sort_by: str = Query("normalized_score", description="Sort field"),
+    db: Session = Depends(get_read_db)
 ):
-    """Get trending workflows (highest engagement)"""
-    return get_workflows(
-        country=country,
-        limit=limit,
-        offset=0,
-        sort_by="engagement_score",
-        order="desc",
-        db=db
-    )
+    """Get trending workflows (highest engagement percentile, comparable across platforms)"""
+    
+    # Served from the in-memory leaderboards; uncommon sort keys fall back to SQL
+    board = leaderboards.top(db, sort_by, platform=platform, country=country, limit=limit)
+    if board is not None:
+        total, workflows = board
+        return {
+            "total": total,
+            "limit": limit,
+            "offset": 0,
+            "workflows": workflows
+        }
+    
+    # Rank the latest snapshot of each workflow, like the leaderboards do
+    query = _workflow_query(db, platform, country).filter(PopularityMetric.id.in_(latest_metric_ids()))
+    total = query.count()
+    results = _apply_sort(query, sort_by, "desc").limit(limit).all()
+    
+    return ORJSONResponse({
+        "total": total,
+        "limit": limit,
+        "offset": 0,
+        "workflows": [row_to_workflow(row) for row in results]
+    })
 
 @router.get("/workflows/stats", response_model=StatsResponse)
-def get_stats(db: Session = Depends(get_db)):
+def get_stats(db: Session = Depends(get_read_db)):
     """Get aggregated statistics"""
     
     # Total workflows
@@ -142,6 +202,198 @@ def get_stats(db: Session = Depends(get_db)):
         "collection_status": collection_status
     }
 
+@router.post("/workflows/batch", response_model=WorkflowBatchResponse)
+def get_workflows_batch(
+    request: WorkflowBatchRequest,
+    db: Session = Depends(get_read_db)
+):
+    """Get many workflows with their latest metrics by ID in one query"""
+    
+    ids = list(dict.fromkeys(request.ids))
+    
+    latest = latest_metric_ids(PopularityMetric.workflow_id.in_(ids))
+    
+    results = db.query(Workflow, PopularityMetric).join(PopularityMetric).filter(
+        PopularityMetric.id.in_(latest)
+    ).all()
+    
+    found = {}
+    for workflow, metric in results:
+        found[workflow.id] = {
+            "workflow_id": workflow.id,
+            "workflow": workflow.workflow_name,
+            "platform": workflow.platform,
+            "popularity_metrics": metric,
+            "country": workflow.country,
+            "collected_at": metric.collected_at
+        }
+    
+    return {
+        "workflows": [found[i] for i in ids if i in found],
+        "missing": [i for i in ids if i not in found]
+    }
+
+@router.get("/workflows/{workflow_id}/history", response_model=WorkflowHistoryResponse)
+def get_workflow_history(
+    workflow_id: int,
+    start: Optional[datetime] = Query(None, alias="from", description="Start of range (inclusive)"),
+    end: Optional[datetime] = Query(None, alias="to", description="End of range (exclusive)"),
+    points: int = Query(200, ge=3, le=5000, description="Maximum points returned"),
+    method: str = Query("lttb", pattern="^(lttb|avg)$", description="Downsampling method"),
+    metric: str = Query("views", description="Series LTTB preserves the shape of"),
+    db: Session = Depends(get_read_db)
+):
+    """Get a workflow's metric history downsampled on the server"""
+    
+    workflow = db.query(Workflow).filter(Workflow.id == workflow_id).first()
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    
+    fields = ["views", "likes", "comments", "engagement_score", "search_volume"]
+    if metric not in fields:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(fields)}")
+    
+    last_seen_at = func.coalesce(PopularityMetric.last_seen_at, PopularityMetric.collected_at)
+    query = db.query(
+        PopularityMetric.collected_at,
+        last_seen_at,
+        *[getattr(PopularityMetric, field) for field in fields]
+    ).filter(PopularityMetric.workflow_id == workflow_id)
+    # Ranges overlapping the window, including one that started before it
+    if start:
+        query = query.filter(last_seen_at >= start)
+    if end:
+        query = query.filter(PopularityMetric.collected_at < end)
+    
+    rows = _expand_snapshots(
+        (
+            (row[0], row[1], *[float(value) if value is not None else None for value in row[2:]])
+            for row in query.order_by(PopularityMetric.collected_at).all()
+        ),
+        start,
+        end
+    )
+    
+    if method == "lttb":
+        xs = [row[0].timestamp() for row in rows]
+        ys = [row[1 + fields.index(metric)] or 0.0 for row in rows]
+        sampled = [rows[i] for i in lttb_indices(xs, ys, points)]
+    else:
+        sampled = []
+        for bucket in bucket_bounds(len(rows), points):
+            chunk = [rows[i] for i in bucket]
+            means = []
+            for column in range(1, len(fields) + 1):
+                values = [row[column] for row in chunk if row[column] is not None]
+                means.append(sum(values) / len(values) if values else None)
+            sampled.append((chunk[0][0], *means))
+    
+    return {
+        "workflow_id": workflow.id,
+        "workflow": workflow.workflow_name,
+        "platform": workflow.platform,
+        "country": workflow.country,
+        "method": method,
+        "total_points": len(rows),
+        "points": [dict(zip(["collected_at"] + fields, row)) for row in sampled]
+    }
+
+@router.get("/workflows/{platform}", response_model=WorkflowListResponse)
+def get_workflows_by_platform(
+    platform: str,
+    country: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db)
+):
+    """Get workflows from specific platform"""
+    return get_workflows(
+        platform=platform,
+        country=country,
+        limit=limit,
+        offset=offset,
+        sort_by="engagement_score",
+        order="desc",
+        db=db
+    )
+
+def _trend_query(db: Session):
+    return db.query(
+        TrendSeries.workflow_id, Workflow.workflow_name, Workflow.country,
+        TrendSeries.start_at, TrendSeries.interval_seconds, TrendSeries.points,
+        TrendSeries.is_partial, TrendSeries.collected_at, TrendSeries.interest
+    ).join(Workflow, TrendSeries.workflow_id == Workflow.id)
+
+def _trend_entries(rows, matrix, **params):
+    """Feature rows for stored series, computed over all of them at once"""
+    features = trend_features(matrix, **params)
+    return [
+        {
+            "workflow_id": row[0],
+            "keyword": row[1],
+            "country": row[2],
+            "start_at": row[3],
+            "interval_seconds": row[4],
+            "points": row[5],
+            "is_partial": row[6],
+            "collected_at": row[7],
+            **{name: values[i].item() for name, values in features.items()}
+        }
+        for i, row in enumerate(rows)
+    ]
+
+@router.get("/trends/features", response_model=TrendFeaturesListResponse)
+def get_trend_features(
+    country: Optional[str] = Query(None, description="Filter by country code"),
+    growth_window: int = Query(7, ge=1, description="Points averaged on each side of the growth comparison"),
+    growth_lag: Optional[int] = Query(None, ge=1, description="Points between the compared windows (default: growth_window)"),
+    slope_window: Optional[int] = Query(None, ge=2, description="Trailing points the slope is fitted to (default: all)"),
+    period: int = Query(7, ge=2, description="Seasonal cycle length in points"),
+    sort_by: str = Query("growth_percentage", pattern="^(growth_percentage|slope|seasonality|mean_interest|latest_interest)$"),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """Trend features of the latest stored series of every Google Trends keyword"""
+    
+    query = _trend_query(db).filter(TrendSeries.id.in_(latest_series_ids()))
+    if country:
+        query = query.filter(Workflow.country == country)
+    rows = query.all()
+    
+    matrix = stack([unpack_interest(row[8]) for row in rows])
+    entries = _trend_entries(
+        rows, matrix,
+        growth_window=growth_window, growth_lag=growth_lag, slope_window=slope_window, period=period
+    )
+    entries.sort(key=lambda entry: entry[sort_by], reverse=True)
+    
+    return {"total": len(entries), "trends": entries[:limit]}
+
+@router.get("/trends/{workflow_id}", response_model=TrendSeriesResponse)
+def get_trend_series(
+    workflow_id: int,
+    growth_window: int = Query(7, ge=1),
+    growth_lag: Optional[int] = Query(None, ge=1),
+    slope_window: Optional[int] = Query(None, ge=2),
+    period: int = Query(7, ge=2),
+    db: Session = Depends(get_read_db)
+):
+    """Latest full interest series of one keyword, with its features"""
+    
+    row = _trend_query(db).filter(
+        TrendSeries.id.in_(latest_series_ids(TrendSeries.workflow_id == workflow_id))
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Trend series not found")
+    
+    interest = unpack_interest(row[8])
+    entry = _trend_entries(
+        [row], stack([interest]),
+        growth_window=growth_window, growth_lag=growth_lag, slope_window=slope_window, period=period
+    )[0]
+    
+    return dict(entry, interest=interest.tolist())
+
 @router.post("/collect")
 def trigger_collection(
     request: CollectRequest,
@@ -156,6 +408,8 @@ def trigger_collection(
     }
     
     results = []
+    archive = RawArchive() if settings.raw_archive_enabled else None
+    cache = EntityCache()
     
     for platform in request.platforms:
         if platform not in collectors:
@@ -165,12 +419,13 @@ def trigger_collection(
         
         for country in request.countries:
             try:
-                collector = collector_class(db)
-                workflows = collector.collect(country, settings.workflows_per_platform)
+                collector = collector_class(db, archive=archive, cache=cache)
+                summary = collector.collect(country, settings.workflows_per_platform)
                 results.append({
                     "platform": platform,
                     "country": country,
-                    "workflows_collected": len(workflows),
+                    "workflows_collected": summary["workflows_collected"],
+                    "new_workflows": summary["new_workflows"],
                     "status": "success"
                 })
             except Exception as e:
@@ -184,9 +439,59 @@ def trigger_collection(
     
     return {
         "status": "completed",
+        "run_id": archive.run_id if archive else None,
         "results": results
     }
 
+@router.get("/stream")
+async def stream_events(request: Request):
+    """Server-sent events for finished collection runs and changed top-K leaderboards"""
+    
+    queue = broadcaster.subscribe()
+    
+    async def events():
+        try:
+            yield b"retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.stream_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield b": heartbeat\n\n"
+                    continue
+                yield b"event: " + event["type"].encode() + b"\ndata: " + dumps(event) + b"\n\n"
+        finally:
+            broadcaster.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/stream/ws")
+async def stream_events_ws(websocket: WebSocket):
+    """WebSocket variant of ``/stream``; each message is one JSON event"""
+    
+    await websocket.accept()
+    queue = broadcaster.subscribe()
+    
+    async def forward():
+        while True:
+            event = await queue.get()
+            await websocket.send_text(dumps(event).decode())
+    
+    sender = asyncio.create_task(forward())
+    try:
+        # Client messages are ignored; reading is how the close is noticed
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        broadcaster.unsubscribe(queue)
+
 @router.get("/health", response_model=HealthResponse)
 def health_check(db: Session = Depends(get_db)):
     """Health check endpoint"""
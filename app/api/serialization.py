@@ -0,0 +1,81 @@
+from typing import Any, Dict, Iterable, Iterator, Sequence
+import orjson
+from sqlalchemy import Float, cast
+from app.database.models import Workflow, PopularityMetric
+
+# Plain columns selected by the fast path, in row order; Numeric columns are
+# cast to float in SQL so rows never pass through Decimal or the ORM
+WORKFLOW_COLUMNS = (
+    Workflow.id,
+    Workflow.workflow_name,
+    Workflow.platform,
+    Workflow.country,
+    PopularityMetric.collected_at,
+    PopularityMetric.views,
+    PopularityMetric.likes,
+    PopularityMetric.comments,
+    cast(PopularityMetric.like_to_view_ratio, Float),
+    cast(PopularityMetric.comment_to_view_ratio, Float),
+    cast(PopularityMetric.engagement_score, Float),
+    PopularityMetric.replies,
+    PopularityMetric.participants,
+    PopularityMetric.search_volume,
+    PopularityMetric.trend_direction,
+    cast(PopularityMetric.growth_percentage, Float),
+    cast(PopularityMetric.normalized_score, Float),
+)
+
+METRIC_NAMES = (
+    'views', 'likes', 'comments', 'like_to_view_ratio', 'comment_to_view_ratio',
+    'engagement_score', 'replies', 'participants', 'search_volume',
+    'trend_direction', 'growth_percentage', 'normalized_score'
+)
+
+STREAM_CHUNK_ROWS = 500
+
+def row_to_workflow(row: Sequence[Any]) -> Dict[str, Any]:
+    """Shape one ``WORKFLOW_COLUMNS`` row like ``WorkflowResponse``"""
+    metrics = dict(zip(METRIC_NAMES, row[5:]))
+    # Match PopularityMetricsResponse, whose common fields are not optional
+    for name in ('views', 'likes', 'comments'):
+        metrics[name] = metrics[name] or 0
+    for name in ('like_to_view_ratio', 'comment_to_view_ratio'):
+        metrics[name] = metrics[name] or 0.0
+
+    return {
+        "workflow_id": row[0],
+        "workflow": row[1],
+        "platform": row[2],
+        "popularity_metrics": metrics,
+        "country": row[3],
+        "collected_at": row[4]
+    }
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes with orjson (datetimes as ISO 8601)"""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def _chunked(rows: Iterable[Sequence[Any]], separator: bytes) -> Iterator[bytes]:
+    """Serialize rows and join them into chunks of ``STREAM_CHUNK_ROWS``"""
+    parts = []
+    for row in rows:
+        parts.append(dumps(row_to_workflow(row)))
+        if len(parts) >= STREAM_CHUNK_ROWS:
+            yield separator.join(parts)
+            parts = []
+    if parts:
+        yield separator.join(parts)
+
+def stream_json_array(rows: Iterable[Sequence[Any]], head: Dict[str, Any], key: str) -> Iterator[bytes]:
+    """Stream ``{**head, key: [rows...]}`` without holding the whole list in memory"""
+    yield dumps(head)[:-1] + (b',' if head else b'') + dumps(key) + b':['
+    first = True
+    for chunk in _chunked(rows, b','):
+        yield chunk if first else b',' + chunk
+        first = False
+    yield b']}'
+
+def stream_ndjson(rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """Stream one JSON object per line"""
+    for chunk in _chunked(rows, b'\n'):
+        yield chunk + b'\n'
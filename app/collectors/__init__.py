@@ -1,6 +1,10 @@
-from .base import BaseCollector
+from .base import BaseCollector, register_commit_listener
+from .archive import RawArchive
+from .batch import CollectedBatch
+from .cache import EntityCache
+from .keyword_registry import KeywordRegistry
 from .youtube_collector import YouTubeCollector
 from .forum_collector import ForumCollector
 from .trends_collector import TrendsCollector
 
-__all__ = ['BaseCollector', 'YouTubeCollector', 'ForumCollector', 'TrendsCollector']
+__all__ = ['BaseCollector', 'register_commit_listener', 'RawArchive', 'CollectedBatch', 'EntityCache', 'KeywordRegistry', 'YouTubeCollector', 'ForumCollector', 'TrendsCollector']
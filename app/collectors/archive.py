@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.config import settings
+
+def new_run_id() -> str:
+    """Return a sortable identifier for a collection run"""
+    return datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
+
+class RawArchive:
+    """Content-addressed, gzip-compressed archive of raw upstream API responses
+
+    Layout under ``root``::
+
+        objects/<sha[:2]>/<sha>.json.gz    one file per distinct payload
+        runs/<run_id>/<platform>.jsonl     manifest of every response seen in a run
+    """
+
+    def __init__(self, root: Optional[str] = None, run_id: Optional[str] = None):
+        self.root = Path(root or settings.raw_archive_dir)
+        self.run_id = run_id or new_run_id()
+
+    def store(self, payload: Any) -> str:
+        """Store a payload and return its content hash"""
+        data = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.parent / f".{digest}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        return digest
+
+    def record(self, platform: str, kind: str, country: str, payload: Any,
+               fetched_at: Optional[datetime] = None, **params) -> str:
+        """Store a payload and append it to this run's manifest for the platform"""
+        digest = self.store(payload)
+        entry = {
+            'sha256': digest,
+            'kind': kind,
+            'country': country,
+            'params': params,
+            'fetched_at': (fetched_at or datetime.utcnow()).isoformat()
+        }
+
+        manifest = self._manifest_path(self.run_id, platform)
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        with open(manifest, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+
+        return digest
+
+    def load(self, digest: str) -> Any:
+        """Load a payload by content hash"""
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            return json.loads(f.read().decode('utf-8'))
+
+    def entries(self, platform: str, run_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate manifest entries recorded for a platform in a run"""
+        manifest = self._manifest_path(run_id or self.run_id, platform)
+        if not manifest.exists():
+            return
+
+        with open(manifest, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def payloads(self, platform: str, run_id: Optional[str] = None) -> Iterator[Tuple[Dict[str, Any], Any]]:
+        """Iterate (entry, payload) pairs recorded for a platform in a run"""
+        for entry in self.entries(platform, run_id):
+            yield entry, self.load(entry['sha256'])
+
+    def runs(self) -> List[str]:
+        """List archived run ids, oldest first"""
+        runs_dir = self.root / 'runs'
+        if not runs_dir.exists():
+            return []
+        return sorted(p.name for p in runs_dir.iterdir() if p.is_dir())
+
+    def platforms(self, run_id: Optional[str] = None) -> List[str]:
+        """List platforms with a manifest in a run"""
+        run_dir = self.root / 'runs' / (run_id or self.run_id)
+        if not run_dir.exists():
+            return []
+        return sorted(p.stem for p in run_dir.glob('*.jsonl'))
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / 'objects' / digest[:2] / f"{digest}.json.gz"
+
+    def _manifest_path(self, run_id: str, platform: str) -> Path:
+        return self.root / 'runs' / run_id / f"{platform}.jsonl"
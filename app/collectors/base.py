@@ -1,15 +1,32 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable
+from datetime import datetime, timezone
+from sqlalchemy import case, false, func, insert, select, update
 from sqlalchemy.orm import Session
-from app.database.models import CollectionLog
+from app.database.models import Workflow, PopularityMetric, CollectionLog, snapshot_rank
+from app.database.notify import notify
+from .archive import RawArchive
+from .batch import CollectedBatch
+from .cache import EntityCache
+from .quantiles import ScoreNormalizer
+
+# Callbacks run after a collection's log row is committed: (platform, log_id, batch)
+_commit_listeners: List[Callable[[str, int, CollectedBatch], None]] = []
+
+def register_commit_listener(listener: Callable[[str, int, CollectedBatch], None]):
+    """Register a callback invoked whenever a collector commits its collection log"""
+    if listener not in _commit_listeners:
+        _commit_listeners.append(listener)
 
 class BaseCollector(ABC):
     """Base class for all data collectors"""
     
-    def __init__(self, db: Session, platform: str):
+    def __init__(self, db: Session, platform: str, archive: Optional[RawArchive] = None,
+                 cache: Optional[EntityCache] = None):
         self.db = db
         self.platform = platform
+        self.archive = archive
+        self.cache = cache
         self.log_id = None
     
     def start_collection(self) -> int:
@@ -25,8 +42,9 @@ class BaseCollector(ABC):
         self.log_id = log.id
         return log.id
     
-    def end_collection(self, workflows_collected: int, error: str = None):
-        """Log collection end"""
+    def end_collection(self, workflows_collected: int, error: str = None,
+                       batch: Optional[CollectedBatch] = None):
+        """Log collection end and notify commit listeners"""
         if self.log_id:
             log = self.db.query(CollectionLog).filter(CollectionLog.id == self.log_id).first()
             if log:
@@ -35,12 +53,233 @@ class BaseCollector(ABC):
                 log.error_message = error
                 log.completed_at = datetime.utcnow()
                 self.db.commit()
+                self._notify_commit(batch if batch is not None else CollectedBatch(self.platform))
+    
+    def _notify_commit(self, batch: CollectedBatch):
+        """Run commit listeners and announce the run to other processes; failures never fail the collection"""
+        try:
+            notify(self.db, {
+                "type": "collection",
+                "platform": self.platform,
+                "log_id": self.log_id,
+                "countries": sorted(set(batch.countries))
+            })
+        except Exception as e:
+            self.db.rollback()
+            print(f"Error publishing collection event: {e}")
+        
+        for listener in _commit_listeners:
+            try:
+                listener(self.platform, self.log_id, batch)
+            except Exception as e:
+                print(f"Error in collection commit listener: {e}")
+    
+    @abstractmethod
+    def collect(self, country: str, limit: int) -> Dict[str, Any]:
+        """Collect workflows data and return summary counts - must be implemented by subclasses"""
+        pass
     
     @abstractmethod
-    def collect(self, country: str, limit: int) -> List[Dict[str, Any]]:
-        """Collect workflows data - must be implemented by subclasses"""
+    def _process_payload(self, kind: str, payload: Any, country: str, params: Dict[str, Any],
+                         batch: CollectedBatch) -> int:
+        """Append rows for one raw upstream response to the batch - must be implemented by subclasses"""
         pass
     
+    def refresh(self, targets: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Re-read stats of known items by platform id for the given countries"""
+        raise NotImplementedError(f"{self.platform} does not support refresh by id")
+    
+    def _save_batch(self, batch: CollectedBatch, start: int = 0, collected_at: Optional[datetime] = None):
+        """Save workflows and metrics for batch rows from ``start`` onwards in one transaction
+
+        ``collected_at`` stamps the snapshots with the time their response was
+        fetched. Rows are compared with the snapshot in effect at that time, so
+        replaying an old response fills in history, and snapshots already
+        stored for that time are skipped.
+        """
+        end = len(batch)
+        if start >= end:
+            return
+        fetched_at = collected_at or datetime.now(timezone.utc)
+        
+        try:
+            rows = range(start, end)
+            existing = self.db.query(Workflow).filter(
+                Workflow.platform == batch.platform,
+                Workflow.platform_id.in_({batch.platform_ids[i] for i in rows}),
+                Workflow.country.in_({batch.countries[i] for i in rows})
+            ).all()
+            workflows = {(w.platform_id, w.country): w for w in existing}
+            
+            new_keys = set()
+            for i in rows:
+                key = (batch.platform_ids[i], batch.countries[i])
+                if key not in workflows:
+                    workflows[key] = Workflow(
+                        workflow_name=batch.workflow_names[i],
+                        platform=batch.platform,
+                        platform_id=key[0],
+                        country=key[1]
+                    )
+                    self.db.add(workflows[key])
+                    new_keys.add(key)
+            self.db.flush()
+            
+            latest = self._latest_hashes(
+                {workflows[key].id for key in workflows if key not in new_keys}, collected_at
+            )
+            normalizer = ScoreNormalizer(self.db, batch.platform)
+            normalizer.load({batch.countries[i] for i in rows})
+            
+            metrics = []
+            unchanged = []
+            # Rows whose percentile is read once the whole batch is in the sketches
+            ranked = []
+            for i in rows:
+                key = (batch.platform_ids[i], batch.countries[i])
+                workflow_id = workflows[key].id
+                batch.workflow_ids.append(workflow_id)
+                batch.is_new.append(key in new_keys)
+                batch.collected_at.append(fetched_at)
+                new_keys.discard(key)
+                
+                metrics_hash = batch.metrics_hash(i)
+                metric_id, latest_hash, score, stored = latest.get(workflow_id, (None, None, None, False))
+                if stored or metrics_hash == latest_hash:
+                    if metric_id is not None and not stored:
+                        unchanged.append(metric_id)
+                    batch.changed.append(False)
+                    batch.scores.append(float(score) if score is not None else 0.0)
+                    if score is None:
+                        ranked.append(i)
+                    continue
+                
+                normalizer.add(batch.countries[i], batch.engagement_score[i])
+                # Later duplicates of this row in the batch are unchanged
+                latest[workflow_id] = (None, metrics_hash, None, False)
+                batch.changed.append(True)
+                batch.scores.append(0.0)
+                ranked.append(i)
+                metrics.append(dict(workflow_id=workflow_id, metrics_hash=metrics_hash, **batch.metrics(i)))
+                if collected_at is not None:
+                    metrics[-1].update(collected_at=collected_at, last_seen_at=collected_at)
+            
+            for i in ranked:
+                batch.scores[i] = normalizer.score(batch.countries[i], batch.engagement_score[i])
+            for metric, i in zip(metrics, (i for i in ranked if batch.changed[i])):
+                metric['normalized_score'] = batch.scores[i]
+            
+            if metrics:
+                self.db.execute(insert(PopularityMetric), metrics)
+            if unchanged:
+                seen_at = func.coalesce(PopularityMetric.last_seen_at, PopularityMetric.collected_at)
+                self.db.execute(
+                    update(PopularityMetric)
+                    .where(PopularityMetric.id.in_(unchanged))
+                    .values(last_seen_at=func.now() if collected_at is None else case(
+                        (seen_at < collected_at, collected_at), else_=seen_at
+                    ))
+                )
+            normalizer.save()
+            self.db.commit()
+            
+        except Exception as e:
+            self.db.rollback()
+            del batch.workflow_ids[start:]
+            del batch.is_new[start:]
+            del batch.changed[start:]
+            del batch.scores[start:]
+            del batch.collected_at[start:]
+            batch.workflow_ids.extend([0] * (end - start))
+            batch.is_new.extend([False] * (end - start))
+            batch.changed.extend([False] * (end - start))
+            batch.scores.extend([0.0] * (end - start))
+            batch.collected_at.extend([fetched_at] * (end - start))
+            print(f"Error saving {self.platform} workflows: {e}")
+    
+    def _latest_hashes(self, workflow_ids, at: Optional[datetime] = None) -> Dict[int, tuple]:
+        """(metric id, metrics hash, normalized score, stored at ``at``) of each workflow's newest snapshot
+
+        With ``at``, the newest snapshot collected no later than ``at``.
+        """
+        if not workflow_ids:
+            return {}
+        
+        ranked = select(
+            PopularityMetric.id,
+            PopularityMetric.workflow_id,
+            PopularityMetric.metrics_hash,
+            PopularityMetric.normalized_score,
+            (PopularityMetric.collected_at == at if at is not None else false()).label('stored'),
+            snapshot_rank().label('rank')
+        ).where(PopularityMetric.workflow_id.in_(workflow_ids))
+        if at is not None:
+            ranked = ranked.where(PopularityMetric.collected_at <= at)
+        ranked = ranked.subquery()
+        
+        rows = self.db.execute(
+            select(
+                ranked.c.id, ranked.c.workflow_id, ranked.c.metrics_hash, ranked.c.normalized_score,
+                ranked.c.stored
+            ).where(ranked.c.rank == 1)
+        ).all()
+        return {
+            workflow_id: (metric_id, metrics_hash, score, bool(stored))
+            for metric_id, workflow_id, metrics_hash, score, stored in rows
+        }
+    
+    def _archive_payload(self, kind: str, country: str, payload: Any, **params) -> datetime:
+        """Record a raw upstream response in the run archive, if one is attached
+
+        Returns the fetch time recorded for it, which stamps the snapshots
+        saved from the response so a later replay recognizes them.
+        """
+        fetched_at = datetime.utcnow()
+        if self.archive is not None:
+            try:
+                self.archive.record(self.platform, kind, country, payload, fetched_at=fetched_at, **params)
+            except Exception as e:
+                print(f"Error archiving {self.platform} {kind} payload: {e}")
+        return fetched_at.replace(tzinfo=timezone.utc)
+    
+    def replay(self, run_id: Optional[str] = None) -> Dict[str, Any]:
+        """Re-run processing and persistence from archived raw responses, without network access
+
+        Snapshots are stamped with each response's original ``fetched_at``, so
+        replaying an old run fills in history instead of overwriting the
+        current values, and replaying a run twice stores nothing new.
+        """
+        if self.archive is None:
+            raise ValueError("Replay requires a raw archive")
+        
+        batch = CollectedBatch(self.platform)
+        
+        try:
+            self.start_collection()
+            
+            for entry, payload in self.archive.payloads(self.platform, run_id):
+                start = len(batch)
+                self._process_payload(entry['kind'], payload, entry['country'], entry.get('params', {}), batch)
+                self._save_batch(batch, start, self._fetched_at(entry))
+            
+            # Replayed rows are history, not current values, so listeners get no
+            # items to merge and resync from the database instead
+            self.end_collection(len(batch))
+            
+        except Exception as e:
+            self.end_collection(len(batch), str(e))
+            raise
+        
+        return batch.summary()
+    
+    @staticmethod
+    def _fetched_at(entry: Dict[str, Any]) -> Optional[datetime]:
+        """UTC time a manifest entry's response was fetched"""
+        if not entry.get('fetched_at'):
+            return None
+        fetched_at = datetime.fromisoformat(entry['fetched_at'])
+        return fetched_at if fetched_at.tzinfo else fetched_at.replace(tzinfo=timezone.utc)
+    
     def calculate_engagement_score(self, views: int, likes: int, comments: int) -> float:
         """Calculate engagement score"""
         if views == 0:
@@ -0,0 +1,102 @@
+import hashlib
+from array import array
+from typing import Any, Dict, Optional
+
+# Metric columns always present, stored as typed arrays
+INT_FIELDS = ('views', 'likes', 'comments')
+FLOAT_FIELDS = ('like_to_view_ratio', 'comment_to_view_ratio', 'engagement_score')
+
+# Platform-specific metric columns, None where a platform does not report them
+OPTIONAL_FIELDS = ('replies', 'participants', 'search_volume', 'trend_direction', 'growth_percentage')
+
+METRIC_FIELDS = INT_FIELDS + FLOAT_FIELDS + OPTIONAL_FIELDS
+
+def metrics_hash(values: tuple) -> int:
+    """64-bit digest of a metric tuple in ``METRIC_FIELDS`` order"""
+    digest = hashlib.blake2b(repr(values).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+class CollectedBatch:
+    """Column-oriented container for the items one collector run produces
+
+    Replaces a list of nested per-item dicts: numeric metrics live in typed
+    ``array`` columns and strings in plain lists, so a batch of thousands of
+    items costs a few flat buffers instead of two dicts per item. The
+    persistence layer reads columns directly and fills in ``workflow_ids``,
+    ``is_new``, ``changed``, the normalized ``scores`` and each row's fetch
+    time in ``collected_at``.
+    """
+
+    __slots__ = (
+        'platform', 'workflow_names', 'platform_ids', 'countries', 'keywords',
+        'views', 'likes', 'comments',
+        'like_to_view_ratio', 'comment_to_view_ratio', 'engagement_score',
+        'replies', 'participants', 'search_volume', 'trend_direction', 'growth_percentage',
+        'workflow_ids', 'is_new', 'changed', 'scores', 'collected_at'
+    )
+
+    def __init__(self, platform: str):
+        self.platform = platform
+        self.workflow_names = []
+        self.platform_ids = []
+        self.countries = []
+        self.keywords = []
+        for field in INT_FIELDS:
+            setattr(self, field, array('q'))
+        for field in FLOAT_FIELDS:
+            setattr(self, field, array('d'))
+        for field in OPTIONAL_FIELDS:
+            setattr(self, field, [])
+        self.workflow_ids = array('q')
+        self.is_new = array('b')
+        self.changed = array('b')
+        self.scores = array('d')
+        self.collected_at = []
+
+    def append(self, workflow_name: str, platform_id: str, country: str,
+               keyword: Optional[str] = None, **metrics):
+        """Append one item; unknown metric names raise, missing ones default to 0/None"""
+        unknown = set(metrics) - set(METRIC_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown metric fields: {', '.join(sorted(unknown))}")
+
+        self.workflow_names.append(workflow_name)
+        self.platform_ids.append(platform_id)
+        self.countries.append(country)
+        self.keywords.append(keyword)
+        for field in INT_FIELDS:
+            getattr(self, field).append(int(metrics.get(field) or 0))
+        for field in FLOAT_FIELDS:
+            getattr(self, field).append(float(metrics.get(field) or 0))
+        for field in OPTIONAL_FIELDS:
+            getattr(self, field).append(metrics.get(field))
+
+    def __len__(self) -> int:
+        return len(self.platform_ids)
+
+    def metrics(self, index: int) -> Dict[str, Any]:
+        """Metric values of one row, keyed like ``PopularityMetric`` columns"""
+        return {field: getattr(self, field)[index] for field in METRIC_FIELDS}
+
+    def metrics_hash(self, index: int) -> int:
+        """64-bit digest of one row's metric tuple, stored to detect unchanged snapshots"""
+        return metrics_hash(tuple(getattr(self, field)[index] for field in METRIC_FIELDS))
+
+    def item(self, index: int) -> Dict[str, Any]:
+        """One row in the legacy nested-dict shape, built on demand"""
+        return {
+            'workflow_name': self.workflow_names[index],
+            'platform': self.platform,
+            'platform_id': self.platform_ids[index],
+            'country': self.countries[index],
+            'metrics': self.metrics(index)
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts reported by ``collect`` instead of the items themselves"""
+        return {
+            'platform': self.platform,
+            'workflows_collected': len(self),
+            'new_workflows': sum(self.is_new),
+            'new_snapshots': sum(self.changed)
+        }
@@ -0,0 +1,48 @@
+import time
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+from app.config import settings
+
+class EntityCache:
+    """Run-scoped, TTL-bounded cache of upstream entities keyed by (platform, platform_id)
+
+    One instance is shared by every country pass of a collection run, so
+    region-agnostic upstream data (YouTube video statistics, the forum topic
+    list) is fetched once and fanned out to per-country rows.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = settings.entity_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, platform: str, platform_id: str) -> Optional[Any]:
+        """Return a cached entity, or None when missing or expired"""
+        key = (platform, platform_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def get_many(self, platform: str, platform_ids: Iterable[str]) -> Dict[str, Any]:
+        """Return the cached subset of the given ids"""
+        found = {}
+        for platform_id in platform_ids:
+            value = self.get(platform, platform_id)
+            if value is not None:
+                found[platform_id] = value
+        return found
+
+    def set(self, platform: str, platform_id: str, value: Any):
+        """Cache an entity until the TTL expires"""
+        with self._lock:
+            self._entries[(platform, platform_id)] = (time.monotonic() + self.ttl_seconds, value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
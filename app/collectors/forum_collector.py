@@ -1,9 +1,11 @@
 import time
 import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from app.config import settings, WORKFLOW_KEYWORDS
-from app.database.models import Workflow, PopularityMetric
+from .archive import RawArchive
+from .batch import CollectedBatch
+from .cache import EntityCache
 from .base import BaseCollector
 
 class ForumCollector(BaseCollector):
@@ -11,47 +13,104 @@ class ForumCollector(BaseCollector):
     
     BASE_URL = "https://community.n8n.io"
     
-    def __init__(self, db: Session):
-        super().__init__(db, "forum")
+    def __init__(self, db: Session, archive: Optional[RawArchive] = None,
+                 cache: Optional[EntityCache] = None):
+        super().__init__(db, "forum", archive, cache)
         self.headers = {
             'Api-Key': settings.discourse_api_key,
             'Api-Username': settings.discourse_api_username
         } if settings.discourse_api_key else {}
     
-    def collect(self, country: str, limit: int = 20) -> List[Dict[str, Any]]:
+    def collect(self, country: str, limit: int = 20) -> Dict[str, Any]:
         """Collect popular forum posts"""
-        workflows = []
+        batch = CollectedBatch(self.platform)
         
         try:
             self.start_collection()
             
             # Get latest topics
-            response = requests.get(
-                f"{self.BASE_URL}/latest.json",
-                headers=self.headers,
-                params={'per_page': limit}
-            )
-            response.raise_for_status()
+            payload = self._get_latest(limit)
+            fetched_at = self._archive_payload('latest', country, payload, limit=limit)
+            
+            self._process_payload('latest', payload, country, {'limit': limit}, batch)
+            self._save_batch(batch, collected_at=fetched_at)
             
-            topics = response.json().get('topic_list', {}).get('topics', [])
+            self.end_collection(len(batch), batch=batch)
             
-            for topic in topics[:limit]:
-                topic_data = self._process_topic(topic, country)
-                if topic_data:
-                    workflows.append(topic_data)
-                    self._save_workflow(topic_data)
+        except Exception as e:
+            self.end_collection(len(batch), str(e), batch=batch)
+            print(f"Forum collection error: {e}")
+        
+        return dict(batch.summary(), country=country)
+    
+    def refresh(self, targets: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Refresh known topics one ``/t/{id}.json`` request at a time, within the rate limit"""
+        batch = CollectedBatch(self.platform)
+        
+        try:
+            self.start_collection()
+            
+            for topic_id, countries in targets.items():
+                try:
+                    response = requests.get(f"{self.BASE_URL}/t/{topic_id}.json", headers=self.headers)
+                    response.raise_for_status()
+                    topic = response.json()
+                except Exception as e:
+                    print(f"Error refreshing topic {topic_id}: {e}")
+                    continue
                 
-                time.sleep(0.5)
+                for country in countries:
+                    fetched_at = self._archive_payload('topic', country, topic)
+                    start = len(batch)
+                    self._process_payload('topic', topic, country, {}, batch)
+                    self._save_batch(batch, start, fetched_at)
+                
+                time.sleep(60 / max(1, settings.discourse_requests_per_minute))
             
-            self.end_collection(len(workflows))
+            self.end_collection(len(batch), batch=batch)
             
         except Exception as e:
-            self.end_collection(len(workflows), str(e))
-            print(f"Forum collection error: {e}")
+            self.end_collection(len(batch), str(e), batch=batch)
+            print(f"Forum refresh error: {e}")
         
-        return workflows
+        return batch.summary()
     
-    def _process_topic(self, topic: Dict, country: str) -> Dict[str, Any]:
+    def _get_latest(self, limit: int) -> Dict[str, Any]:
+        """Fetch ``/latest.json``; the forum is not regional, so one fetch serves every country"""
+        cache_key = f"latest:{limit}"
+        payload = self.cache.get(self.platform, cache_key) if self.cache is not None else None
+        
+        if payload is None:
+            response = requests.get(
+                f"{self.BASE_URL}/latest.json",
+                headers=self.headers,
+                params={'per_page': limit}
+            )
+            response.raise_for_status()
+            payload = response.json()
+            if self.cache is not None:
+                self.cache.set(self.platform, cache_key, payload)
+        
+        return payload
+    
+    def _process_payload(self, kind: str, payload: Any, country: str, params: Dict[str, Any],
+                         batch: CollectedBatch) -> int:
+        """Process a raw ``/latest.json`` listing or a single ``/t/{id}.json`` topic"""
+        if kind == 'topic':
+            return 1 if self._process_topic(payload, country, batch) else 0
+        if kind != 'latest':
+            return 0
+        
+        topics = payload.get('topic_list', {}).get('topics', [])
+        limit = params.get('limit', len(topics))
+        
+        appended = 0
+        for topic in topics[:limit]:
+            if self._process_topic(topic, country, batch):
+                appended += 1
+        return appended
+    
+    def _process_topic(self, topic: Dict, country: str, batch: CollectedBatch) -> bool:
         """Process forum topic data"""
         try:
             views = topic.get('views', 0)
@@ -63,53 +122,20 @@ class ForumCollector(BaseCollector):
             # Calculate engagement
             engagement = (views * 0.1 + likes * 5 + replies * 3 + participants * 2) / 100
             
-            return {
-                'workflow_name': topic['title'],
-                'platform': 'forum',
-                'platform_id': str(topic['id']),
-                'country': country,
-                'metrics': {
-                    'views': views,
-                    'likes': likes,
-                    'comments': posts,
-                    'replies': replies,
-                    'participants': participants,
-                    'like_to_view_ratio': round(likes / views, 6) if views > 0 else 0,
-                    'comment_to_view_ratio': round(posts / views, 6) if views > 0 else 0,
-                    'engagement_score': round(engagement, 4)
-                }
-            }
-        except Exception as e:
-            print(f"Error processing topic: {e}")
-            return None
-    
-    def _save_workflow(self, data: Dict[str, Any]):
-        """Save workflow and metrics to database"""
-        try:
-            workflow = self.db.query(Workflow).filter(
-                Workflow.platform == data['platform'],
-                Workflow.platform_id == data['platform_id'],
-                Workflow.country == data['country']
-            ).first()
-            
-            if not workflow:
-                workflow = Workflow(
-                    workflow_name=data['workflow_name'],
-                    platform=data['platform'],
-                    platform_id=data['platform_id'],
-                    country=data['country']
-                )
-                self.db.add(workflow)
-                self.db.commit()
-                self.db.refresh(workflow)
-            
-            metric = PopularityMetric(
-                workflow_id=workflow.id,
-                **data['metrics']
+            batch.append(
+                topic['title'],
+                str(topic['id']),
+                country,
+                views=views,
+                likes=likes,
+                comments=posts,
+                replies=replies,
+                participants=participants,
+                like_to_view_ratio=round(likes / views, 6) if views > 0 else 0,
+                comment_to_view_ratio=round(posts / views, 6) if views > 0 else 0,
+                engagement_score=round(engagement, 4)
             )
-            self.db.add(metric)
-            self.db.commit()
-            
+            return True
         except Exception as e:
-            self.db.rollback()
-            print(f"Error saving forum workflow: {e}")
+            print(f"Error processing topic: {e}")
+            return False
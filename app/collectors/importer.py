@@ -0,0 +1,310 @@
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from app.config import settings
+from app.database import engine
+from .batch import INT_FIELDS, FLOAT_FIELDS, METRIC_FIELDS, metrics_hash
+from .quantiles import rebuild_scores
+
+logger = logging.getLogger(__name__)
+
+PLATFORMS = ("youtube", "forum", "google")
+FORMATS = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv", ".parquet": "parquet"}
+
+KEY_FIELDS = ("workflow_name", "platform", "platform_id", "country")
+STAGING_COLUMNS = KEY_FIELDS + ("collected_at",) + METRIC_FIELDS + ("metrics_hash",)
+
+# Column widths and numeric limits of the target tables; values are fitted
+# before COPY so one bad row cannot abort the whole load
+STRING_WIDTHS = {"workflow_name": 500, "platform": 50, "platform_id": 255, "country": 10, "trend_direction": 20}
+FLOAT_LIMITS = {
+    "like_to_view_ratio": 9999.999999,
+    "comment_to_view_ratio": 9999.999999,
+    "engagement_score": 999999.9999,
+    "growth_percentage": 99999999.99
+}
+INT_MAX = 2 ** 31 - 1
+
+# Inputs each platform's engagement formula needs beyond the common counts;
+# rows without them (and without a supplied score) cannot be scored
+SCORE_INPUTS = {"forum": ("replies", "participants"), "google": ("search_volume",)}
+
+STAGING_DDL = """
+CREATE TEMP TABLE import_rows (
+    workflow_name VARCHAR(500),
+    platform VARCHAR(50),
+    platform_id VARCHAR(255),
+    country VARCHAR(10),
+    collected_at TIMESTAMPTZ,
+    views INTEGER,
+    likes INTEGER,
+    comments INTEGER,
+    like_to_view_ratio DECIMAL(10, 6),
+    comment_to_view_ratio DECIMAL(10, 6),
+    engagement_score DECIMAL(10, 4),
+    replies INTEGER,
+    participants INTEGER,
+    search_volume INTEGER,
+    trend_direction VARCHAR(20),
+    growth_percentage DECIMAL(10, 2),
+    metrics_hash BIGINT
+) ON COMMIT DROP
+"""
+
+MERGE_WORKFLOWS = """
+INSERT INTO workflows (workflow_name, platform, platform_id, country)
+SELECT DISTINCT ON (platform, platform_id, country) workflow_name, platform, platform_id, country
+FROM import_rows
+ORDER BY platform, platform_id, country, collected_at DESC
+ON CONFLICT (platform, platform_id, country) DO NOTHING
+"""
+
+_METRICS = ", ".join(METRIC_FIELDS)
+
+# Consecutive identical snapshots of a workflow collapse into one row whose
+# last_seen_at spans them, as live collection stores them. A range is keyed by
+# (workflow_id, collected_at of its first snapshot), so re-imports skip it.
+MERGE_METRICS = f"""
+WITH deduped AS (
+    SELECT DISTINCT ON (platform, platform_id, country, collected_at) *
+    FROM import_rows
+    ORDER BY platform, platform_id, country, collected_at
+),
+ordered AS (
+    SELECT w.id AS workflow_id, d.collected_at, d.metrics_hash, {", ".join(f"d.{field}" for field in METRIC_FIELDS)},
+           CASE WHEN d.metrics_hash = LAG(d.metrics_hash) OVER (PARTITION BY w.id ORDER BY d.collected_at)
+                THEN 0 ELSE 1 END AS starts_range
+    FROM deduped d
+    JOIN workflows w ON w.platform = d.platform AND w.platform_id = d.platform_id AND w.country = d.country
+),
+grouped AS (
+    SELECT *, SUM(starts_range) OVER (PARTITION BY workflow_id ORDER BY collected_at) AS range_id
+    FROM ordered
+),
+ranges AS (
+    SELECT DISTINCT ON (workflow_id, range_id)
+           workflow_id, collected_at, metrics_hash, {_METRICS},
+           MAX(collected_at) OVER (PARTITION BY workflow_id, range_id) AS last_seen_at
+    FROM grouped
+    ORDER BY workflow_id, range_id, collected_at
+)
+INSERT INTO popularity_metrics (workflow_id, collected_at, metrics_hash, {_METRICS}, last_seen_at)
+SELECT r.workflow_id, r.collected_at, r.metrics_hash, {", ".join(f"r.{field}" for field in METRIC_FIELDS)}, r.last_seen_at
+FROM ranges r
+WHERE NOT EXISTS (
+    SELECT 1 FROM popularity_metrics m
+    WHERE m.workflow_id = r.workflow_id AND m.collected_at = r.collected_at
+)
+"""
+
+def import_paths(paths: List[str]) -> List[Path]:
+    """Supported files among ``paths``, expanding directories recursively"""
+    files = []
+    for path in map(Path, paths):
+        candidates = sorted(path.rglob("*")) if path.is_dir() else [path]
+        files.extend(p for p in candidates if p.suffix.lower() in FORMATS and p.is_file())
+    return files
+
+def read_chunks(path: Path, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Stream a file as DataFrames of at most ``chunk_rows`` rows"""
+    kind = FORMATS[path.suffix.lower()]
+    text_columns = {field: str for field in KEY_FIELDS + ("trend_direction",)}
+
+    if kind == "parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif kind == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_rows, dtype=text_columns)
+    else:
+        yield from pd.read_json(path, lines=True, chunksize=chunk_rows, dtype=text_columns)
+
+def _numeric(df: pd.DataFrame, field: str) -> pd.Series:
+    if field not in df:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[field], errors="coerce")
+
+def _python_values(column: pd.Series) -> list:
+    """Column as the Python values ``CollectedBatch`` holds (int, float, str or None)"""
+    return column.astype(object).where(column.notna(), None).tolist()
+
+def _round(values: np.ndarray, digits: int) -> np.ndarray:
+    """Python's ``round`` per value, so scores hash exactly like the collectors' ones"""
+    return np.array([round(value, digits) for value in values.tolist()], dtype=np.float64)
+
+def _engagement(platform: np.ndarray, views: np.ndarray, likes: np.ndarray, comments: np.ndarray,
+                replies: np.ndarray, participants: np.ndarray, search_volume: np.ndarray) -> np.ndarray:
+    """Engagement score with each platform's collector formula"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        youtube = np.where(views > 0, (likes * 2 + comments * 5) / views, 0.0)
+    forum = (views * 0.1 + likes * 5 + replies * 3 + participants * 2) / 100
+    # Trends stores search_volume as the whole average interest times 100
+    google = np.floor(search_volume / 100) / 10
+    score = np.select([platform == "forum", platform == "google"], [forum, google], youtube)
+    return _round(np.nan_to_num(score), 4)
+
+def prepare_chunk(df: pd.DataFrame) -> Tuple[bytes, int, int]:
+    """Validate and score one chunk; returns (CSV for COPY, rows kept, rows rejected)
+
+    Rows need a name, a known platform, a platform id, a country and a
+    parseable ``collected_at``; counts must be non-negative. Ratios and the
+    engagement score are computed like the collectors do unless supplied;
+    forum rows need ``replies`` and ``participants`` and Trends rows
+    ``search_volume`` for that.
+    """
+    # Accept the API's "workflow" name for the workflow_name column
+    if "workflow" in df:
+        name = df["workflow"] if "workflow_name" not in df else df["workflow_name"].fillna(df["workflow"])
+        df = df.assign(workflow_name=name)
+    missing = [field for field in KEY_FIELDS + ("collected_at",) if field not in df]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    out = pd.DataFrame(index=df.index)
+    for field in KEY_FIELDS:
+        out[field] = df[field].astype("string").str.strip().str.slice(0, STRING_WIDTHS[field])
+    out["platform"] = out["platform"].str.lower()
+    out["collected_at"] = pd.to_datetime(df["collected_at"], utc=True, errors="coerce", format="ISO8601")
+
+    counts = {field: _numeric(df, field).fillna(0) for field in INT_FIELDS}
+    valid = out[list(KEY_FIELDS)].notna().all(axis=1) & out["collected_at"].notna()
+    valid &= out["platform"].isin(PLATFORMS)
+    for field in KEY_FIELDS:
+        valid &= out[field].str.len() > 0
+    for values in counts.values():
+        valid &= values >= 0
+    inputs = {field: _numeric(df, field) for field in ("replies", "participants", "search_volume")}
+    unscored = _numeric(df, "engagement_score").isna()
+    for platform, fields in SCORE_INPUTS.items():
+        lacking = pd.concat([inputs[field].isna() for field in fields], axis=1).any(axis=1)
+        valid &= ~((out["platform"] == platform) & unscored & lacking)
+
+    out = out[valid]
+    for field in INT_FIELDS:
+        out[field] = counts[field][valid].clip(upper=INT_MAX).astype("int64")
+    for field, values in inputs.items():
+        out[field] = values[valid].clip(0, INT_MAX).round().astype("Int64")
+
+    def column(field: str) -> np.ndarray:
+        return out[field].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    views, likes, comments = column("views"), column("likes"), column("comments")
+    google = (out["platform"] == "google").to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Trends rows have no likes or comments; the collector stores 0 ratios
+        scored = {
+            "like_to_view_ratio": _round(np.where((views > 0) & ~google, likes / views, 0.0), 6),
+            "comment_to_view_ratio": _round(np.where((views > 0) & ~google, comments / views, 0.0), 6),
+            "engagement_score": _engagement(
+                out["platform"].to_numpy(dtype=object), views, likes, comments,
+                column("replies"), column("participants"), column("search_volume")
+            )
+        }
+    for field in FLOAT_FIELDS:
+        supplied = _numeric(df, field)[valid]
+        out[field] = supplied.fillna(pd.Series(scored[field], index=out.index)).clip(-FLOAT_LIMITS[field], FLOAT_LIMITS[field])
+
+    out["trend_direction"] = (
+        df["trend_direction"][valid].astype("string").str.slice(0, STRING_WIDTHS["trend_direction"])
+        if "trend_direction" in df else pd.Series(pd.NA, index=out.index, dtype="string")
+    )
+    # Always a float, as the Trends collector stores it, whatever the file's dtype
+    growth = _numeric(df, "growth_percentage")[valid].astype("Float64")
+    out["growth_percentage"] = growth.clip(-FLOAT_LIMITS["growth_percentage"], FLOAT_LIMITS["growth_percentage"])
+
+    # Same digest live collection stores, so later collections of an imported
+    # item are suppressed when nothing changed
+    out["metrics_hash"] = [metrics_hash(values) for values in zip(*(_python_values(out[field]) for field in METRIC_FIELDS))]
+
+    # numpy formats timestamps far faster than to_csv's per-value strftime
+    out["collected_at"] = np.datetime_as_string(
+        out["collected_at"].dt.tz_convert(None).to_numpy(dtype="datetime64[us]"), unit="us", timezone="UTC"
+    )
+
+    payload = out[list(STAGING_COLUMNS)].to_csv(index=False, header=False)
+    return payload.encode(), len(out), int((~valid).sum())
+
+def import_files(paths: List[str], workers: Optional[int] = None,
+                 chunk_rows: Optional[int] = None) -> Dict[str, int]:
+    """Bulk-load historical snapshots from NDJSON, CSV or Parquet files
+
+    Chunks are validated and scored across a process pool and streamed into
+    a temporary staging table with COPY; one set-based merge then adds
+    missing workflows and snapshot ranges. Everything runs in a single
+    transaction, and rows already present are skipped, so re-running an
+    import is safe. The score sketches of every imported (platform, country)
+    are then rebuilt and the new snapshots given normalized scores.
+    """
+    files = import_paths(paths)
+    if not files:
+        raise ValueError("No .ndjson, .jsonl, .csv or .parquet files found")
+
+    workers = workers or os.cpu_count() or 1
+    chunk_rows = chunk_rows or settings.import_chunk_rows
+    totals = {"files": len(files), "staged": 0, "rejected": 0, "workflows": 0, "snapshots": 0}
+    started = time.monotonic()
+
+    raw = engine.raw_connection()
+    conn = raw.driver_connection
+    try:
+        with conn.cursor() as cur:
+            cur.execute(STAGING_DDL)
+            copy_sql = f"COPY import_rows ({', '.join(STAGING_COLUMNS)}) FROM STDIN (FORMAT csv)"
+
+            def stage(done):
+                for future in done:
+                    payload, kept, rejected = future.result()
+                    with cur.copy(copy_sql) as copy:
+                        copy.write(payload)
+                    totals["staged"] += kept
+                    totals["rejected"] += rejected
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"Staged {totals['staged']} rows ({totals['rejected']} rejected), "
+                    f"{totals['staged'] / max(elapsed, 1e-9):.0f} rows/s"
+                )
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = set()
+                for path in files:
+                    logger.info(f"Reading {path}")
+                    for chunk in read_chunks(path, chunk_rows):
+                        pending.add(pool.submit(prepare_chunk, chunk))
+                        # Bound the chunks held in memory to a couple per worker
+                        if len(pending) >= 2 * workers:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            stage(done)
+                if pending:
+                    stage(wait(pending)[0])
+
+            logger.info("Merging staged rows...")
+            cur.execute("ANALYZE import_rows")
+            cur.execute(MERGE_WORKFLOWS)
+            totals["workflows"] = cur.rowcount
+            cur.execute(MERGE_METRICS)
+            totals["snapshots"] = cur.rowcount
+            # The staging table is dropped on commit
+            cur.execute("SELECT DISTINCT platform, country FROM import_rows")
+            scopes = cur.fetchall()
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        raw.close()
+
+    if totals["snapshots"]:
+        logger.info(f"Rebuilding score sketches for {len(scopes)} platform/country scopes...")
+        rebuild_scores(scopes=scopes)
+
+    logger.info(
+        f"Imported {totals['snapshots']} snapshots and {totals['workflows']} new workflows "
+        f"from {totals['staged']} rows in {time.monotonic() - started:.1f}s"
+    )
+    return totals
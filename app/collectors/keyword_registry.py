@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database.models import SearchKeyword, KeywordYield
+from .batch import CollectedBatch
+
+class KeywordRegistry:
+    """Database-backed search keywords ordered by expected new items per quota unit
+
+    Each run records, per keyword, how many new workflows it found, how many
+    duplicates, and the quota it cost. ``plan`` spends most of the budget on
+    the best-yielding keywords and reserves an exploration share for terms
+    with too few runs to judge, and for pruned terms due for a retry.
+    """
+
+    def __init__(self, db: Session, platform: str):
+        self.db = db
+        self.platform = platform
+
+    def sync(self, seeds: List[str]) -> List[SearchKeyword]:
+        """Register seed keywords that are not in the registry yet and return active keywords"""
+        keywords = self.db.query(SearchKeyword).filter(SearchKeyword.platform == self.platform).all()
+        known = {k.keyword for k in keywords}
+
+        added = [SearchKeyword(platform=self.platform, keyword=seed, runs=0, new_items=0,
+                               duplicate_items=0, quota_spent=0, active=True)
+                 for seed in dict.fromkeys(seeds) if seed not in known]
+        if added:
+            self.db.add_all(added)
+            self.db.commit()
+            keywords.extend(added)
+
+        return [k for k in keywords if k.active]
+
+    def plan(self, seeds: List[str], budget: float, cost: float) -> List[str]:
+        """Order keywords by expected marginal yield and cut the list at the quota budget"""
+        keywords = self.sync(seeds)
+        slots = max(1, int(budget // cost)) if cost > 0 else len(keywords)
+        min_runs = settings.keyword_min_runs
+
+        def is_pruned(k: SearchKeyword) -> bool:
+            return k.runs >= min_runs and float(k.yield_score or 0) < settings.keyword_min_yield
+
+        # Exploration pool: under-sampled terms first, then pruned terms least recently tried
+        explore = sorted(
+            (k for k in keywords if k.runs < min_runs or is_pruned(k)),
+            key=lambda k: (k.runs >= min_runs, k.last_run_at.timestamp() if k.last_run_at else 0.0, k.runs)
+        )
+        exploit = sorted(
+            (k for k in keywords if k.runs >= min_runs and not is_pruned(k)),
+            key=lambda k: float(k.yield_score or 0),
+            reverse=True
+        )
+
+        share = settings.keyword_exploration_share
+        explore_slots = min(len(explore), slots, max(1, round(slots * share)))
+        explore_picks = explore[:explore_slots]
+        # Leftover budget goes to unproven terms, never to pruned ones
+        unproven = [k for k in explore[explore_slots:] if k.runs < min_runs]
+        exploit_picks = (exploit + unproven)[:slots - explore_slots]
+
+        # Best yield first with an exploration term every 1/share positions, starting
+        # with one, so exploration still happens when the item limit stops a run early
+        stride = max(1, round(1 / share)) if share > 0 else slots + 1
+        ordered = []
+        while explore_picks or exploit_picks:
+            if explore_picks and (len(ordered) % stride == 0 or not exploit_picks):
+                ordered.append(explore_picks.pop(0))
+            else:
+                ordered.append(exploit_picks.pop(0))
+        return [k.keyword for k in ordered]
+
+    def record(self, log_id: int, batch: CollectedBatch, quota_units: Dict[str, int], new_only: bool = True):
+        """Record one run's yield for every keyword that spent quota
+        
+        With ``new_only=False`` every returned item counts as yield; used where
+        a keyword maps to a single series (Trends) and the useful signal is
+        whether it returns data at all.
+        """
+        new_items = dict.fromkeys(quota_units, 0)
+        duplicates = dict.fromkeys(quota_units, 0)
+        for keyword, is_new in zip(batch.keywords, batch.is_new):
+            if keyword not in new_items:
+                continue
+            if is_new or not new_only:
+                new_items[keyword] += 1
+            else:
+                duplicates[keyword] += 1
+
+        keywords = self.db.query(SearchKeyword).filter(
+            SearchKeyword.platform == self.platform,
+            SearchKeyword.keyword.in_(list(quota_units))
+        ).all()
+
+        alpha = settings.keyword_yield_alpha
+        now = datetime.utcnow()
+        for keyword in keywords:
+            spent = quota_units[keyword.keyword]
+            found = new_items[keyword.keyword]
+            observed = found / spent if spent else 0.0
+            previous = keyword.yield_score
+
+            keyword.runs += 1
+            keyword.new_items += found
+            keyword.duplicate_items += duplicates[keyword.keyword]
+            keyword.quota_spent += spent
+            keyword.yield_score = observed if previous is None else alpha * observed + (1 - alpha) * float(previous)
+            keyword.last_run_at = now
+
+            self.db.add(KeywordYield(
+                keyword_id=keyword.id,
+                log_id=log_id,
+                new_items=found,
+                duplicate_items=duplicates[keyword.keyword],
+                quota_units=spent
+            ))
+
+        self.db.commit()
@@ -0,0 +1,186 @@
+import json
+import math
+import random
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.database.models import Workflow, PopularityMetric, ScoreSketch
+
+SCORED_METRIC = "engagement_score"
+
+# Fill normalized scores the sketches never saw (imports, rows from before
+# scoring) with the exact cumulative distribution of their scope
+BACKFILL_SCORES = text("""
+    UPDATE popularity_metrics SET normalized_score = ranked.score
+    FROM (
+        SELECT m.id, CUME_DIST() OVER (ORDER BY m.engagement_score) AS score
+        FROM popularity_metrics m JOIN workflows w ON w.id = m.workflow_id
+        WHERE w.platform = :platform AND w.country = :country AND m.engagement_score IS NOT NULL
+    ) AS ranked
+    WHERE popularity_metrics.id = ranked.id AND popularity_metrics.normalized_score IS NULL
+""")
+
+class KLLSketch:
+    """KLL streaming quantile sketch over floats
+
+    Keeps a stack of compactors whose capacities shrink geometrically (by
+    2/3) below the top level; a full compactor sorts itself and promotes
+    every other item, doubling its weight. Space is O(k) and rank error
+    about 1.7/k regardless of stream length, so k=200 gives roughly 1%.
+    """
+
+    def __init__(self, k: int = 200, n: int = 0, levels: Optional[List[List[float]]] = None):
+        self.k = k
+        self.n = n
+        self.levels = levels or [[]]
+        self._rng = random.Random()
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, value: float):
+        self.levels[0].append(float(value))
+        self.n += 1
+        if sum(map(len, self.levels)) >= sum(self._capacity(h) for h in range(len(self.levels))):
+            self._compress()
+
+    def _compress(self):
+        for level, items in enumerate(self.levels):
+            if len(items) < self._capacity(level):
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            items = sorted(items)
+            # An odd item out stays behind at its current weight
+            carry = [items.pop()] if len(items) % 2 else []
+            self.levels[level + 1].extend(items[self._rng.randint(0, 1)::2])
+            self.levels[level] = carry
+            return
+
+    def rank(self, value: float) -> float:
+        """Estimated fraction of the stream that is <= ``value``"""
+        below = total = 0
+        for level, items in enumerate(self.levels):
+            weight = 1 << level
+            total += weight * len(items)
+            below += weight * sum(1 for item in items if item <= value)
+        return below / total if total else 0.0
+
+    def to_json(self) -> str:
+        return json.dumps({"k": self.k, "n": self.n, "levels": self.levels}, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: str) -> "KLLSketch":
+        state = json.loads(data)
+        return cls(k=state["k"], n=state["n"], levels=state["levels"])
+
+class ScoreNormalizer:
+    """Per-(platform, country) sketches that turn engagement scores into percentiles
+
+    Raw engagement scores come from different formulas per platform, so they
+    only rank within a platform. New snapshots are added to their scope's
+    sketch and scored with their percentile there (0-1], which ranks across
+    platforms; a batch is added in full before any of it is ranked, so its
+    order does not matter. Sketches are loaded ``FOR UPDATE`` so concurrent
+    writers to a scope serialize, and saved in the caller's transaction.
+    """
+
+    def __init__(self, db: Session, platform: str):
+        self.db = db
+        self.platform = platform
+        self._rows: Dict[str, ScoreSketch] = {}
+        self._sketches: Dict[str, KLLSketch] = {}
+
+    def load(self, countries: Iterable[str]):
+        """Fetch and lock the sketches of the given countries"""
+        wanted = set(countries) - set(self._sketches)
+        if not wanted:
+            return
+
+        rows = self.db.query(ScoreSketch).filter(
+            ScoreSketch.platform == self.platform,
+            ScoreSketch.country.in_(wanted),
+            ScoreSketch.metric == SCORED_METRIC
+        ).with_for_update().all()
+        for row in rows:
+            self._rows[row.country] = row
+            self._sketches[row.country] = KLLSketch.from_json(row.sketch)
+        for country in wanted - set(self._sketches):
+            self._sketches[country] = KLLSketch(settings.score_sketch_k)
+
+    def add(self, country: str, value: float):
+        """Add a value to its scope's distribution"""
+        self.load([country])
+        self._sketches[country].update(value)
+
+    def score(self, country: str, value: float) -> float:
+        """Percentile of a value within its scope"""
+        self.load([country])
+        return round(self._sketches[country].rank(value), 6)
+
+    def reset(self, country: str, sketch: KLLSketch):
+        """Replace a scope's sketch, e.g. with one rebuilt from history"""
+        self.load([country])
+        self._sketches[country] = sketch
+
+    def save(self):
+        """Stage the updated sketches in the session; the caller commits"""
+        for country, sketch in self._sketches.items():
+            row = self._rows.get(country)
+            if row is None:
+                if not sketch.n:
+                    continue
+                row = self._rows[country] = ScoreSketch(
+                    platform=self.platform, country=country, metric=SCORED_METRIC
+                )
+                self.db.add(row)
+            row.sketch = sketch.to_json()
+            row.count = sketch.n
+            row.updated_at = datetime.utcnow()
+
+def rebuild_scores(db: Optional[Session] = None,
+                   scopes: Optional[List[Tuple[str, str]]] = None) -> Dict[Tuple[str, str], int]:
+    """Rebuild sketches from stored snapshots and backfill missing normalized scores
+
+    Used after bulk imports and to score rows written before scoring existed.
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    counts = {}
+
+    try:
+        if scopes is None:
+            scopes = db.query(Workflow.platform, Workflow.country).distinct().all()
+
+        for platform, country in scopes:
+            if country is None:
+                continue
+            sketch = KLLSketch(settings.score_sketch_k)
+            values = db.execute(
+                select(PopularityMetric.engagement_score)
+                .join(Workflow, PopularityMetric.workflow_id == Workflow.id)
+                .where(
+                    Workflow.platform == platform,
+                    Workflow.country == country,
+                    PopularityMetric.engagement_score.isnot(None)
+                ).execution_options(yield_per=50000)
+            ).scalars()
+            for value in values:
+                sketch.update(value)
+
+            normalizer = ScoreNormalizer(db, platform)
+            normalizer.reset(country, sketch)
+            normalizer.save()
+
+            db.execute(BACKFILL_SCORES, {"platform": platform, "country": country})
+            db.commit()
+            counts[(platform, country)] = sketch.n
+    finally:
+        if own_session:
+            db.close()
+
+    return counts
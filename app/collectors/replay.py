@@ -0,0 +1,78 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from app.database import SessionLocal
+from .archive import RawArchive
+from .youtube_collector import YouTubeCollector
+from .forum_collector import ForumCollector
+from .trends_collector import TrendsCollector
+
+logger = logging.getLogger(__name__)
+
+COLLECTORS = {
+    "youtube": YouTubeCollector,
+    "forum": ForumCollector,
+    "google": TrendsCollector
+}
+
+def replay_unit(run_id: str, platform: str, root: Optional[str] = None) -> int:
+    """Replay one archived (run, platform) unit through processing and persistence"""
+    db = SessionLocal()
+    try:
+        archive = RawArchive(root=root, run_id=run_id)
+        collector = COLLECTORS[platform](db, archive=archive)
+        return collector.replay(run_id)['workflows_collected']
+    finally:
+        db.close()
+
+def replay_run(run_id: str, platforms: Optional[List[str]] = None, root: Optional[str] = None) -> Dict[str, int]:
+    """Replay every platform archived for a run in the current process"""
+    archive = RawArchive(root=root, run_id=run_id)
+    results = {}
+
+    for platform in platforms or archive.platforms(run_id):
+        if platform not in COLLECTORS:
+            continue
+        results[platform] = replay_unit(run_id, platform, root)
+        logger.info(f"Replayed {results[platform]} {platform} workflows from run {run_id}")
+
+    return results
+
+def replay_platform(run_ids: List[str], platform: str, root: Optional[str] = None) -> Dict[str, int]:
+    """Replay one platform's units of several runs in order; a failed unit does not stop the rest"""
+    results = {}
+    for run_id in run_ids:
+        try:
+            results[run_id] = replay_unit(run_id, platform, root)
+        except Exception as e:
+            logger.error(f"Error reprocessing {platform} from run {run_id}: {e}")
+    return results
+
+def reprocess_runs(run_ids: Optional[List[str]] = None, workers: Optional[int] = None,
+                   root: Optional[str] = None) -> Dict[Tuple[str, str], int]:
+    """Replay many archived runs across a process pool, one platform per task
+
+    A platform's units run one at a time, oldest run first, so they never race
+    to create the same workflows; different platforms share no rows and run
+    in parallel.
+    """
+    archive = RawArchive(root=root)
+    units: Dict[str, List[str]] = {}
+    for run_id in sorted(run_ids or archive.runs()):
+        for platform in archive.platforms(run_id):
+            if platform in COLLECTORS:
+                units.setdefault(platform, []).append(run_id)
+    results = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(replay_platform, platform_runs, platform, root): platform
+            for platform, platform_runs in units.items()
+        }
+        for future in as_completed(futures):
+            platform = futures[future]
+            for run_id, count in future.result().items():
+                results[(run_id, platform)] = count
+                logger.info(f"Reprocessed {count} {platform} workflows from run {run_id}")
+
+    return results
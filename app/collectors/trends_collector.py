@@ -1,28 +1,52 @@
 import time
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+import pandas as pd
 from pytrends.request import TrendReq
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from app.config import settings, WORKFLOW_KEYWORDS
-from app.database.models import Workflow, PopularityMetric
+from app.database.models import TrendSeries
+from app.analytics.trend_features import pack_interest
+from .archive import RawArchive
+from .batch import CollectedBatch
+from .cache import EntityCache
+from .keyword_registry import KeywordRegistry
 from .base import BaseCollector
 
 class TrendsCollector(BaseCollector):
     """Collector for Google Trends data"""
     
-    def __init__(self, db: Session):
-        super().__init__(db, "google")
-        self.pytrends = TrendReq(hl='en-US', tz=360)
+    def __init__(self, db: Session, archive: Optional[RawArchive] = None,
+                 cache: Optional[EntityCache] = None):
+        super().__init__(db, "google", archive, cache)
+        self._pytrends = None
+        # (batch row, trend_series columns) waiting for the row's workflow id
+        self._pending_series: List[Tuple[int, Dict[str, Any]]] = []
     
-    def collect(self, country: str, limit: int = 20) -> List[Dict[str, Any]]:
+    @property
+    def pytrends(self) -> TrendReq:
+        """Create the pytrends client on first use so offline replay never opens a session"""
+        if self._pytrends is None:
+            self._pytrends = TrendReq(hl='en-US', tz=360)
+        return self._pytrends
+    
+    def collect(self, country: str, limit: int = 20) -> Dict[str, Any]:
         """Collect Google Trends data for n8n workflows"""
-        workflows = []
-        keywords = WORKFLOW_KEYWORDS["google_trends"]
+        batch = CollectedBatch(self.platform)
+        registry = KeywordRegistry(self.db, self.platform)
+        quota_units = {}
         
         try:
             self.start_collection()
             
-            for keyword in keywords[:limit]:
+            # One request per keyword; drop terms that keep returning no data
+            keywords = registry.plan(WORKFLOW_KEYWORDS["google_trends"], budget=limit, cost=1)
+            
+            for keyword in keywords:
                 try:
+                    quota_units[keyword] = 1
+                    
                     # Build payload
                     self.pytrends.build_payload(
                         [keyword],
@@ -35,10 +59,12 @@ class TrendsCollector(BaseCollector):
                     interest_df = self.pytrends.interest_over_time()
                     
                     if not interest_df.empty:
-                        trend_data = self._process_trend(keyword, interest_df, country)
-                        if trend_data:
-                            workflows.append(trend_data)
-                            self._save_workflow(trend_data)
+                        payload = interest_df.to_dict(orient='split')
+                        fetched_at = self._archive_payload('interest_over_time', country, payload, keyword=keyword)
+                        
+                        start = len(batch)
+                        self._process_payload('interest_over_time', payload, country, {'keyword': keyword}, batch)
+                        self._save_batch(batch, start, fetched_at)
                     
                     time.sleep(2)  # Rate limiting
                     
@@ -46,15 +72,86 @@ class TrendsCollector(BaseCollector):
                     print(f"Error collecting trend for '{keyword}': {e}")
                     continue
             
-            self.end_collection(len(workflows))
+            registry.record(self.log_id, batch, quota_units, new_only=False)
+            self.end_collection(len(batch), batch=batch)
             
         except Exception as e:
-            self.end_collection(len(workflows), str(e))
+            self.end_collection(len(batch), str(e), batch=batch)
             print(f"Trends collection error: {e}")
         
-        return workflows
+        return dict(batch.summary(), country=country)
+    
+    def _process_payload(self, kind: str, payload: Any, country: str, params: Dict[str, Any],
+                         batch: CollectedBatch) -> int:
+        """Process a raw ``interest_over_time`` frame stored in pandas 'split' orientation"""
+        if kind != 'interest_over_time':
+            return 0
+        
+        interest_df = pd.DataFrame(
+            payload['data'],
+            index=pd.to_datetime(payload['index']),
+            columns=payload['columns']
+        )
+        return 1 if self._process_trend(params['keyword'], interest_df, country, batch) else 0
+    
+    def _save_batch(self, batch: CollectedBatch, start: int = 0, collected_at: Optional[datetime] = None):
+        """Save rows as usual, then the full interest series behind each of them"""
+        super()._save_batch(batch, start, collected_at)
+        
+        pending, self._pending_series = self._pending_series, []
+        series = [
+            dict(workflow_id=batch.workflow_ids[row], log_id=self.log_id, **columns)
+            for row, columns in pending
+            if row >= start and batch.workflow_ids[row]
+        ]
+        if collected_at is not None:
+            for columns in series:
+                columns['collected_at'] = collected_at
+        if not series:
+            return
+        
+        # Replays fetch the same series again; keep one row per series and only
+        # let a later fetch refresh a window whose last point was partial
+        statement = insert(TrendSeries)
+        statement = statement.on_conflict_do_update(
+            index_elements=[
+                TrendSeries.workflow_id, TrendSeries.start_at, TrendSeries.interval_seconds, TrendSeries.points
+            ],
+            set_={
+                'log_id': statement.excluded.log_id,
+                'interest': statement.excluded.interest,
+                'is_partial': statement.excluded.is_partial,
+                'collected_at': statement.excluded.collected_at
+            },
+            where=TrendSeries.is_partial & (statement.excluded.collected_at > TrendSeries.collected_at)
+        )
+        
+        try:
+            self.db.execute(statement, series)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            print(f"Error saving trend series: {e}")
     
-    def _process_trend(self, keyword: str, interest_df, country: str) -> Dict[str, Any]:
+    def _series_columns(self, keyword: str, interest_df) -> Optional[Dict[str, Any]]:
+        """``trend_series`` columns for an evenly spaced interest frame, else None"""
+        index = interest_df.index
+        if len(index) < 2:
+            return None
+        steps = index[1:] - index[:-1]
+        if (steps != steps[0]).any():
+            print(f"Skipping unevenly spaced trend series for '{keyword}'")
+            return None
+        
+        return {
+            'start_at': index[0].to_pydatetime(),
+            'interval_seconds': int(steps[0].total_seconds()),
+            'points': len(index),
+            'interest': pack_interest(interest_df[keyword].values),
+            'is_partial': bool(interest_df['isPartial'].iloc[-1]) if 'isPartial' in interest_df else False
+        }
+    
+    def _process_trend(self, keyword: str, interest_df, country: str, batch: CollectedBatch) -> bool:
         """Process trend data and calculate growth"""
         try:
             values = interest_df[keyword].values
@@ -63,7 +160,7 @@ class TrendsCollector(BaseCollector):
             older_interest = int(values[-60:-53].mean())  # 60-53 days ago
             
             # Calculate growth
-            growth = 0
+            growth = 0.0
             if older_interest > 0:
                 growth = round(((recent_interest - older_interest) / older_interest) * 100, 2)
             
@@ -78,54 +175,26 @@ class TrendsCollector(BaseCollector):
             # Estimate search volume (approximation based on interest)
             estimated_volume = avg_interest * 100
             
-            return {
-                'workflow_name': keyword,
-                'platform': 'google',
-                'platform_id': keyword.replace(' ', '-'),
-                'country': country,
-                'metrics': {
-                    'views': estimated_volume,
-                    'likes': 0,
-                    'comments': 0,
-                    'search_volume': estimated_volume,
-                    'trend_direction': trend_direction,
-                    'growth_percentage': growth,
-                    'engagement_score': round(avg_interest / 10, 4),
-                    'like_to_view_ratio': 0,
-                    'comment_to_view_ratio': 0
-                }
-            }
-        except Exception as e:
-            print(f"Error processing trend: {e}")
-            return None
-    
-    def _save_workflow(self, data: Dict[str, Any]):
-        """Save workflow and metrics to database"""
-        try:
-            workflow = self.db.query(Workflow).filter(
-                Workflow.platform == data['platform'],
-                Workflow.platform_id == data['platform_id'],
-                Workflow.country == data['country']
-            ).first()
-            
-            if not workflow:
-                workflow = Workflow(
-                    workflow_name=data['workflow_name'],
-                    platform=data['platform'],
-                    platform_id=data['platform_id'],
-                    country=data['country']
-                )
-                self.db.add(workflow)
-                self.db.commit()
-                self.db.refresh(workflow)
-            
-            metric = PopularityMetric(
-                workflow_id=workflow.id,
-                **data['metrics']
+            batch.append(
+                keyword,
+                keyword.replace(' ', '-'),
+                country,
+                keyword=keyword,
+                views=estimated_volume,
+                likes=0,
+                comments=0,
+                search_volume=estimated_volume,
+                trend_direction=trend_direction,
+                growth_percentage=growth,
+                engagement_score=round(avg_interest / 10, 4),
+                like_to_view_ratio=0,
+                comment_to_view_ratio=0
             )
-            self.db.add(metric)
-            self.db.commit()
             
+            columns = self._series_columns(keyword, interest_df)
+            if columns:
+                self._pending_series.append((len(batch) - 1, columns))
+            return True
         except Exception as e:
-            self.db.rollback()
-            print(f"Error saving trends workflow: {e}")
+            print(f"Error processing trend: {e}")
+            return False
@@ -1,69 +1,150 @@
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from googleapiclient.discovery import build
 from sqlalchemy.orm import Session
 from app.config import settings, WORKFLOW_KEYWORDS
-from app.database.models import Workflow, PopularityMetric
+from .archive import RawArchive
+from .batch import CollectedBatch
+from .cache import EntityCache
+from .keyword_registry import KeywordRegistry
 from .base import BaseCollector
 
 class YouTubeCollector(BaseCollector):
     """Collector for YouTube workflow videos"""
     
-    def __init__(self, db: Session):
-        super().__init__(db, "youtube")
+    MAX_IDS_PER_CALL = 50
+    
+    def __init__(self, db: Session, archive: Optional[RawArchive] = None,
+                 cache: Optional[EntityCache] = None):
+        super().__init__(db, "youtube", archive, cache)
         self.youtube = build('youtube', 'v3', developerKey=settings.youtube_api_key)
+        self.quota_used = 0
     
-    def collect(self, country: str, limit: int = 20) -> List[Dict[str, Any]]:
+    def collect(self, country: str, limit: int = 20) -> Dict[str, Any]:
         """Collect YouTube videos about n8n workflows"""
-        workflows = []
-        keywords = WORKFLOW_KEYWORDS["youtube"]
+        batch = CollectedBatch(self.platform)
+        registry = KeywordRegistry(self.db, self.platform)
+        quota_units = {}
         
         try:
             self.start_collection()
             
+            # Spend this country's share of the daily quota on the best-yielding keywords
+            keywords = registry.plan(
+                WORKFLOW_KEYWORDS["youtube"],
+                budget=(settings.youtube_requests_per_day - settings.refresh_quota_per_day) / max(1, len(settings.country_list)),
+                cost=settings.youtube_search_cost + settings.youtube_videos_cost
+            )
+            
             for keyword in keywords:
-                if len(workflows) >= limit:
+                if len(batch) >= limit:
                     break
                 
+                quota_before = self.quota_used
+                
                 # Search for videos
                 search_response = self.youtube.search().list(
                     q=keyword,
                     part='id,snippet',
-                    maxResults=min(5, limit - len(workflows)),
+                    maxResults=min(5, limit - len(batch)),
                     type='video',
                     regionCode=country,
                     relevanceLanguage='en'
                 ).execute()
+                self.quota_used += settings.youtube_search_cost
+                self._archive_payload('search', country, search_response, keyword=keyword)
                 
                 video_ids = [item['id']['videoId'] for item in search_response.get('items', [])]
                 
                 if not video_ids:
+                    quota_units[keyword] = self.quota_used - quota_before
                     continue
                 
                 # Get video statistics
-                videos_response = self.youtube.videos().list(
-                    part='statistics,snippet',
-                    id=','.join(video_ids)
-                ).execute()
+                videos_response = self._get_videos(video_ids)
+                fetched_at = self._archive_payload('videos', country, videos_response, keyword=keyword)
                 
-                for video in videos_response.get('items', []):
-                    video_data = self._process_video(video, country)
-                    if video_data:
-                        workflows.append(video_data)
-                        self._save_workflow(video_data)
+                start = len(batch)
+                self._process_payload('videos', videos_response, country, {'keyword': keyword}, batch)
+                self._save_batch(batch, start, fetched_at)
+                quota_units[keyword] = self.quota_used - quota_before
                 
                 # Rate limiting
                 time.sleep(1)
             
-            self.end_collection(len(workflows))
+            registry.record(self.log_id, batch, quota_units)
+            self.end_collection(len(batch), batch=batch)
+            
+        except Exception as e:
+            self.end_collection(len(batch), str(e), batch=batch)
+            raise
+        
+        return dict(batch.summary(), country=country)
+    
+    def refresh(self, targets: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Refresh statistics of known videos by id, 50 per call and no search cost"""
+        batch = CollectedBatch(self.platform)
+        video_ids = list(targets)
+        
+        try:
+            self.start_collection()
+            
+            for i in range(0, len(video_ids), self.MAX_IDS_PER_CALL):
+                chunk = video_ids[i:i + self.MAX_IDS_PER_CALL]
+                videos_response = self._get_videos(chunk)
+                
+                # Statistics are global; fan out to every country tracking the video
+                for country in sorted({c for video_id in chunk for c in targets[video_id]}):
+                    payload = {'items': [v for v in videos_response['items'] if country in targets[v['id']]]}
+                    fetched_at = self._archive_payload('videos', country, payload, refresh=True)
+                    
+                    start = len(batch)
+                    self._process_payload('videos', payload, country, {}, batch)
+                    self._save_batch(batch, start, fetched_at)
+            
+            self.end_collection(len(batch), batch=batch)
             
         except Exception as e:
-            self.end_collection(len(workflows), str(e))
+            self.end_collection(len(batch), str(e), batch=batch)
             raise
         
-        return workflows
+        return batch.summary()
+    
+    def _get_videos(self, video_ids: List[str]) -> Dict[str, Any]:
+        """Fetch video resources, only requesting ids not already in the run cache
+        
+        Statistics are global, so a video found by several country passes is
+        requested once per run.
+        """
+        cached = self.cache.get_many(self.platform, video_ids) if self.cache is not None else {}
+        missing = [video_id for video_id in video_ids if video_id not in cached]
+        
+        if missing:
+            response = self.youtube.videos().list(
+                part='statistics,snippet',
+                id=','.join(missing)
+            ).execute()
+            self.quota_used += settings.youtube_videos_cost
+            for video in response.get('items', []):
+                cached[video['id']] = video
+                if self.cache is not None:
+                    self.cache.set(self.platform, video['id'], video)
+        
+        return {'items': [cached[video_id] for video_id in video_ids if video_id in cached]}
+    
+    def _process_payload(self, kind: str, payload: Any, country: str, params: Dict[str, Any],
+                         batch: CollectedBatch) -> int:
+        """Process a raw YouTube response; only ``videos().list`` responses carry statistics"""
+        if kind != 'videos':
+            return 0
+        
+        appended = 0
+        for video in payload.get('items', []):
+            if self._process_video(video, country, batch, params.get('keyword')):
+                appended += 1
+        return appended
     
-    def _process_video(self, video: Dict, country: str) -> Dict[str, Any]:
+    def _process_video(self, video: Dict, country: str, batch: CollectedBatch, keyword: Optional[str] = None) -> bool:
         """Process video data and calculate metrics"""
         try:
             stats = video['statistics']
@@ -77,53 +158,19 @@ class YouTubeCollector(BaseCollector):
             comment_ratio = round(comments / views, 6) if views > 0 else 0
             engagement = self.calculate_engagement_score(views, likes, comments)
             
-            return {
-                'workflow_name': snippet['title'],
-                'platform': 'youtube',
-                'platform_id': video['id'],
-                'country': country,
-                'metrics': {
-                    'views': views,
-                    'likes': likes,
-                    'comments': comments,
-                    'like_to_view_ratio': like_ratio,
-                    'comment_to_view_ratio': comment_ratio,
-                    'engagement_score': engagement
-                }
-            }
-        except Exception as e:
-            print(f"Error processing video: {e}")
-            return None
-    
-    def _save_workflow(self, data: Dict[str, Any]):
-        """Save workflow and metrics to database"""
-        try:
-            # Check if workflow exists
-            workflow = self.db.query(Workflow).filter(
-                Workflow.platform == data['platform'],
-                Workflow.platform_id == data['platform_id'],
-                Workflow.country == data['country']
-            ).first()
-            
-            if not workflow:
-                workflow = Workflow(
-                    workflow_name=data['workflow_name'],
-                    platform=data['platform'],
-                    platform_id=data['platform_id'],
-                    country=data['country']
-                )
-                self.db.add(workflow)
-                self.db.commit()
-                self.db.refresh(workflow)
-            
-            # Add metrics
-            metric = PopularityMetric(
-                workflow_id=workflow.id,
-                **data['metrics']
+            batch.append(
+                snippet['title'],
+                video['id'],
+                country,
+                keyword=keyword,
+                views=views,
+                likes=likes,
+                comments=comments,
+                like_to_view_ratio=like_ratio,
+                comment_to_view_ratio=comment_ratio,
+                engagement_score=engagement
             )
-            self.db.add(metric)
-            self.db.commit()
-            
+            return True
         except Exception as e:
-            self.db.rollback()
-            print(f"Error saving workflow: {e}")
+            print(f"Error processing video: {e}")
+            return False
@@ -1,4 +1,8 @@
-"""Workflow keywords and search terms for data collection"""
+"""Workflow keywords and search terms for data collection
+
+Search terms seed the database-backed keyword registry; new entries are picked
+up on the next run and explored before being ranked by yield.
+"""
 
 WORKFLOW_KEYWORDS = {
     "youtube": [
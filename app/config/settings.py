@@ -9,12 +9,22 @@ class Settings(BaseSettings):
     supabase_key: str
     supabase_service_key: str
     database_url: str
+    # Seconds to wait for a database connection before giving up
+    database_connect_timeout: int = 5
+    
+    # Read replicas (comma-separated URLs; empty reads from the primary)
+    read_replica_urls: str = ""
+    replica_max_lag_seconds: float = 5.0
+    replica_lag_check_seconds: float = 5.0
     
     # API Keys
     youtube_api_key: str
     discourse_api_key: str = ""
     discourse_api_username: str = ""
     
+    # Admin keys (comma-separated) allowed to profile requests
+    admin_api_keys: str = ""
+    
     # Application
     app_env: str = "development"
     api_host: str = "0.0.0.0"
@@ -33,6 +43,58 @@ class Settings(BaseSettings):
     workflows_per_platform: int = 20
     countries: str = "US,IN"
     
+    # Raw Response Archive
+    raw_archive_enabled: bool = True
+    raw_archive_dir: str = "data/raw"
+    
+    # Run-scoped entity cache
+    entity_cache_ttl_seconds: int = 3600
+    
+    # API responses
+    export_max_rows: int = 100000
+    compression_minimum_size: int = 1000
+    
+    # Trending leaderboards
+    leaderboard_size: int = 100
+    leaderboard_sync_seconds: float = 30.0
+    
+    # Yield-adaptive keyword registry
+    youtube_search_cost: int = 100
+    youtube_videos_cost: int = 1
+    keyword_exploration_share: float = 0.2
+    keyword_min_runs: int = 3
+    keyword_min_yield: float = 0.0005
+    keyword_yield_alpha: float = 0.3
+    
+    # Adaptive refresh
+    enable_refresh: bool = True
+    refresh_interval_minutes: int = 60
+    refresh_quota_per_day: int = 480
+    refresh_forum_topics_per_run: int = 30
+    refresh_default_rate: float = 0.05
+    refresh_rate_floor: float = 0.001
+    refresh_min_priority: float = 1.0
+    
+    # Parquet metric archive
+    parquet_archive_dir: str = "data/parquet"
+    parquet_export_cron: str = "30 3 * * *"
+    
+    # Change feed
+    events_channel: str = "workflow_events"
+    enable_event_listener: bool = True
+    stream_top_k: int = 10
+    stream_queue_size: int = 100
+    stream_heartbeat_seconds: float = 15.0
+    
+    # Profiling
+    profile_dir: str = "data/profiles"
+    
+    # Cross-platform score normalization (KLL sketch size; ~1.7/k rank error)
+    score_sketch_k: int = 200
+    
+    # Bulk import
+    import_chunk_rows: int = 100000
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -41,5 +103,15 @@ class Settings(BaseSettings):
     def country_list(self) -> List[str]:
         """Return countries as a list"""
         return [c.strip() for c in self.countries.split(",")]
+    
+    @property
+    def admin_api_key_list(self) -> List[str]:
+        """Return admin API keys as a list"""
+        return [k.strip() for k in self.admin_api_keys.split(",") if k.strip()]
+    
+    @property
+    def read_replica_url_list(self) -> List[str]:
+        """Return read replica URLs as a list"""
+        return [u.strip() for u in self.read_replica_urls.split(",") if u.strip()]
 
 settings = Settings()
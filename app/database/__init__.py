@@ -1,4 +1,4 @@
-from .database import get_db, SessionLocal, engine
-from .models import Workflow, PopularityMetric, CollectionLog
+from .database import get_db, get_read_db, SessionLocal, engine, replica_router
+from .models import Workflow, PopularityMetric, CollectionLog, SearchKeyword, KeywordYield, TrendSeries, ScoreSketch
 
-__all__ = ['get_db', 'SessionLocal', 'engine', 'Workflow', 'PopularityMetric', 'CollectionLog']
+__all__ = ['get_db', 'get_read_db', 'SessionLocal', 'engine', 'replica_router', 'Workflow', 'PopularityMetric', 'CollectionLog', 'SearchKeyword', 'KeywordYield', 'TrendSeries', 'ScoreSketch']
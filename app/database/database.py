@@ -1,13 +1,31 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from .replicas import ReplicaRouter
+
+def _create_engine(url: str):
+    # Bound connection attempts so an unreachable server fails fast
+    connect_args = {}
+    if make_url(url).get_backend_name() == "postgresql":
+        connect_args["connect_timeout"] = settings.database_connect_timeout
+    return create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        connect_args=connect_args,
+    )
 
 # Create database engine
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_recycle=3600,
+engine = _create_engine(settings.database_url)
+
+# Read replicas; API reads fall back to the primary when they lag
+replica_router = ReplicaRouter(
+    engine,
+    [_create_engine(url) for url in settings.read_replica_url_list],
+    max_lag_seconds=settings.replica_max_lag_seconds,
+    check_seconds=settings.replica_lag_check_seconds
 )
 
 # Create session factory
@@ -17,9 +35,17 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 def get_db():
-    """Dependency for getting database session"""
+    """Dependency for getting a primary database session (writes)"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    """Dependency for getting a read-only session on a fresh replica, or the primary"""
+    db = SessionLocal(bind=replica_router.read_engine())
+    try:
+        yield db
+    finally:
+        db.close()
@@ -32,12 +32,15 @@ CREATE TABLE popularity_metrics (
     like_to_view_ratio DECIMAL(10, 6),
     comment_to_view_ratio DECIMAL(10, 6),
     engagement_score DECIMAL(10, 4),
+    normalized_score DECIMAL(7, 6),
     replies INTEGER,
     participants INTEGER,
     search_volume INTEGER,
     trend_direction VARCHAR(20),
     growth_percentage DECIMAL(10, 2),
-    collected_at TIMESTAMPTZ DEFAULT NOW()
+    collected_at TIMESTAMPTZ DEFAULT NOW(),
+    metrics_hash BIGINT,
+    last_seen_at TIMESTAMPTZ DEFAULT NOW()
 );
 
 ALTER TABLE popularity_metrics ENABLE ROW LEVEL SECURITY;
@@ -48,9 +51,10 @@ CREATE POLICY "Allow public read access" ON popularity_metrics
 CREATE POLICY "Allow service role full access" ON popularity_metrics
     FOR ALL USING (auth.role() = 'service_role');
 
-CREATE INDEX idx_metrics_workflow_id ON popularity_metrics(workflow_id);
+CREATE INDEX idx_metrics_workflow_id ON popularity_metrics(workflow_id, collected_at DESC, id DESC);
 CREATE INDEX idx_metrics_collected_at ON popularity_metrics(collected_at DESC);
 CREATE INDEX idx_metrics_engagement ON popularity_metrics(engagement_score DESC);
+CREATE INDEX idx_metrics_normalized ON popularity_metrics(normalized_score DESC NULLS LAST);
 
 -- Create collection_logs table
 CREATE TABLE collection_logs (
@@ -61,6 +65,7 @@ CREATE TABLE collection_logs (
     error_message TEXT,
     started_at TIMESTAMPTZ,
     completed_at TIMESTAMPTZ,
+    profile_path VARCHAR(500),
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
@@ -75,6 +80,98 @@ CREATE POLICY "Allow service role full access" ON collection_logs
 CREATE INDEX idx_logs_created_at ON collection_logs(created_at DESC);
 CREATE INDEX idx_logs_platform ON collection_logs(platform);
 
+-- Create search_keywords table (yield-adaptive keyword registry)
+CREATE TABLE search_keywords (
+    id BIGSERIAL PRIMARY KEY,
+    platform VARCHAR(50) NOT NULL,
+    keyword VARCHAR(255) NOT NULL,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    runs INTEGER NOT NULL DEFAULT 0,
+    new_items INTEGER NOT NULL DEFAULT 0,
+    duplicate_items INTEGER NOT NULL DEFAULT 0,
+    quota_spent INTEGER NOT NULL DEFAULT 0,
+    yield_score DECIMAL(12, 6),
+    last_run_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT unique_search_keyword UNIQUE(platform, keyword)
+);
+
+ALTER TABLE search_keywords ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access" ON search_keywords
+    FOR SELECT USING (true);
+
+CREATE POLICY "Allow service role full access" ON search_keywords
+    FOR ALL USING (auth.role() = 'service_role');
+
+CREATE INDEX idx_search_keywords_platform ON search_keywords(platform);
+
+-- Create keyword_yields table (per-run yield of each keyword)
+CREATE TABLE keyword_yields (
+    id BIGSERIAL PRIMARY KEY,
+    keyword_id BIGINT REFERENCES search_keywords(id) ON DELETE CASCADE,
+    log_id BIGINT REFERENCES collection_logs(id) ON DELETE SET NULL,
+    new_items INTEGER DEFAULT 0,
+    duplicate_items INTEGER DEFAULT 0,
+    quota_units INTEGER DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE keyword_yields ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access" ON keyword_yields
+    FOR SELECT USING (true);
+
+CREATE POLICY "Allow service role full access" ON keyword_yields
+    FOR ALL USING (auth.role() = 'service_role');
+
+CREATE INDEX idx_keyword_yields_keyword_id ON keyword_yields(keyword_id);
+CREATE INDEX idx_keyword_yields_created_at ON keyword_yields(created_at DESC);
+
+-- Create trend_series table (full Google Trends interest series per run)
+CREATE TABLE trend_series (
+    id BIGSERIAL PRIMARY KEY,
+    workflow_id BIGINT NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    log_id BIGINT REFERENCES collection_logs(id) ON DELETE SET NULL,
+    start_at TIMESTAMPTZ NOT NULL,
+    interval_seconds INTEGER NOT NULL,
+    points INTEGER NOT NULL,
+    interest BYTEA NOT NULL,
+    is_partial BOOLEAN NOT NULL DEFAULT FALSE,
+    collected_at TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT unique_trend_series UNIQUE(workflow_id, start_at, interval_seconds, points)
+);
+
+ALTER TABLE trend_series ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access" ON trend_series
+    FOR SELECT USING (true);
+
+CREATE POLICY "Allow service role full access" ON trend_series
+    FOR ALL USING (auth.role() = 'service_role');
+
+CREATE INDEX idx_trend_series_workflow ON trend_series(workflow_id, id DESC);
+
+-- Create score_sketches table (per-scope engagement quantile sketches)
+CREATE TABLE score_sketches (
+    id BIGSERIAL PRIMARY KEY,
+    platform VARCHAR(50) NOT NULL,
+    country VARCHAR(10) NOT NULL,
+    metric VARCHAR(50) NOT NULL DEFAULT 'engagement_score',
+    sketch TEXT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT unique_score_sketch UNIQUE(platform, country, metric)
+);
+
+ALTER TABLE score_sketches ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow public read access" ON score_sketches
+    FOR SELECT USING (true);
+
+CREATE POLICY "Allow service role full access" ON score_sketches
+    FOR ALL USING (auth.role() = 'service_role');
+
 -- Create auto-update trigger
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
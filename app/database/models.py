@@ -1,6 +1,9 @@
-from sqlalchemy import Column, BigInteger, String, Integer, DateTime, Numeric, Text, ForeignKey
+from sqlalchemy import (
+    Column, BigInteger, String, Integer, DateTime, Numeric, Text, ForeignKey, Boolean, UniqueConstraint,
+    LargeBinary, Index
+)
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import extract, func, select
 from .database import Base
 
 class Workflow(Base):
@@ -33,6 +36,10 @@ class PopularityMetric(Base):
     comment_to_view_ratio = Column(Numeric(10, 6))
     engagement_score = Column(Numeric(10, 4), index=True)
     
+    # Percentile of engagement_score within its platform and country (0-1],
+    # comparable across platforms
+    normalized_score = Column(Numeric(7, 6), index=True)
+    
     # Platform-specific
     replies = Column(Integer, nullable=True)
     participants = Column(Integer, nullable=True)
@@ -42,8 +49,30 @@ class PopularityMetric(Base):
     
     collected_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
+    # Unchanged re-collections extend last_seen_at instead of adding a row
+    metrics_hash = Column(BigInteger, nullable=True)
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    
     # Relationship
     workflow = relationship("Workflow", back_populates="metrics")
+    
+    __table_args__ = (Index("idx_metrics_workflow_id", workflow_id, collected_at.desc(), id.desc()),)
+
+def snapshot_rank():
+    """Position of a snapshot in its workflow's history, newest (1) first
+
+    Ordered by ``collected_at`` rather than id: bulk imports add older
+    snapshots after the live ones, so the highest id is not the latest.
+    """
+    return func.row_number().over(
+        partition_by=PopularityMetric.workflow_id,
+        order_by=(PopularityMetric.collected_at.desc(), PopularityMetric.id.desc())
+    )
+
+def latest_metric_ids(*criteria):
+    """Select the id of each workflow's newest snapshot, among those matching ``criteria``"""
+    ranked = select(PopularityMetric.id, snapshot_rank().label('rank')).where(*criteria).subquery()
+    return select(ranked.c.id).where(ranked.c.rank == 1)
 
 class CollectionLog(Base):
     __tablename__ = "collection_logs"
@@ -55,4 +84,89 @@ class CollectionLog(Base):
     error_message = Column(Text, nullable=True)
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
+    profile_path = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class SearchKeyword(Base):
+    __tablename__ = "search_keywords"
+    __table_args__ = (UniqueConstraint("platform", "keyword", name="unique_search_keyword"),)
+    
+    id = Column(BigInteger, primary_key=True, index=True)
+    platform = Column(String(50), nullable=False, index=True)
+    keyword = Column(String(255), nullable=False)
+    active = Column(Boolean, nullable=False, default=True)
+    
+    # Running totals
+    runs = Column(Integer, nullable=False, default=0)
+    new_items = Column(Integer, nullable=False, default=0)
+    duplicate_items = Column(Integer, nullable=False, default=0)
+    quota_spent = Column(Integer, nullable=False, default=0)
+    
+    # Exponentially weighted new items per quota unit
+    yield_score = Column(Numeric(12, 6), nullable=True)
+    
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class KeywordYield(Base):
+    __tablename__ = "keyword_yields"
+    
+    id = Column(BigInteger, primary_key=True, index=True)
+    keyword_id = Column(BigInteger, ForeignKey("search_keywords.id", ondelete="CASCADE"), index=True)
+    log_id = Column(BigInteger, ForeignKey("collection_logs.id", ondelete="SET NULL"), nullable=True)
+    new_items = Column(Integer, default=0)
+    duplicate_items = Column(Integer, default=0)
+    quota_units = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class TrendSeries(Base):
+    __tablename__ = "trend_series"
+    __table_args__ = (
+        Index("idx_trend_series_workflow", "workflow_id", "id"),
+        UniqueConstraint("workflow_id", "start_at", "interval_seconds", "points", name="unique_trend_series"),
+    )
+    
+    id = Column(BigInteger, primary_key=True, index=True)
+    workflow_id = Column(BigInteger, ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False)
+    log_id = Column(BigInteger, ForeignKey("collection_logs.id", ondelete="SET NULL"), nullable=True)
+    
+    # Evenly spaced interest values (0-100), one unsigned byte per point
+    start_at = Column(DateTime(timezone=True), nullable=False)
+    interval_seconds = Column(Integer, nullable=False)
+    points = Column(Integer, nullable=False)
+    interest = Column(LargeBinary, nullable=False)
+    is_partial = Column(Boolean, nullable=False, default=False)
+    
+    collected_at = Column(DateTime(timezone=True), server_default=func.now())
+
+def series_rank():
+    """Position of a series among its keyword's stored series, latest (1) first
+
+    Ordered by where the window ends, then by ``collected_at``: replaying an
+    old response stores an older window after the current one, so neither
+    the highest id nor the newest ``collected_at`` alone is the latest.
+    """
+    window_end = extract('epoch', TrendSeries.start_at) + TrendSeries.interval_seconds * TrendSeries.points
+    return func.row_number().over(
+        partition_by=TrendSeries.workflow_id,
+        order_by=(window_end.desc(), TrendSeries.collected_at.desc(), TrendSeries.id.desc())
+    )
+
+def latest_series_ids(*criteria):
+    """Select the id of each keyword's latest series, among those matching ``criteria``"""
+    ranked = select(TrendSeries.id, series_rank().label('rank')).where(*criteria).subquery()
+    return select(ranked.c.id).where(ranked.c.rank == 1)
+
+class ScoreSketch(Base):
+    __tablename__ = "score_sketches"
+    __table_args__ = (UniqueConstraint("platform", "country", "metric", name="unique_score_sketch"),)
+    
+    id = Column(BigInteger, primary_key=True, index=True)
+    platform = Column(String(50), nullable=False)
+    country = Column(String(10), nullable=False)
+    metric = Column(String(50), nullable=False, default="engagement_score")
+    
+    # Serialized KLL quantile sketch and the number of values it summarizes
+    sketch = Column(Text, nullable=False)
+    count = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
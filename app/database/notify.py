@@ -0,0 +1,53 @@
+import json
+import threading
+from typing import Any, Callable, Dict
+import psycopg
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.config import settings
+
+def notify(db: Session, event: Dict[str, Any]) -> bool:
+    """Publish an event on the Postgres NOTIFY channel; False when not on Postgres"""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": settings.events_channel, "payload": json.dumps(event, default=str)}
+    )
+    db.commit()
+    return True
+
+def _psycopg_url(url: str) -> str:
+    """Strip the SQLAlchemy driver suffix so psycopg can connect directly"""
+    scheme, rest = url.split("://", 1)
+    return f"{scheme.split('+', 1)[0]}://{rest}"
+
+class NotificationListener(threading.Thread):
+    """Background thread that LISTENs on the events channel and hands payloads to a callback
+
+    Reconnects with a short back-off when the connection drops.
+    """
+
+    def __init__(self, callback: Callable[[Dict[str, Any]], None], url: str = None):
+        super().__init__(name="pg-notify-listener", daemon=True)
+        self.callback = callback
+        self.url = _psycopg_url(url or settings.database_url)
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                with psycopg.connect(self.url, autocommit=True) as conn:
+                    conn.execute(f'LISTEN "{settings.events_channel}"')
+                    while not self._stop_event.is_set():
+                        for notification in conn.notifies(timeout=1.0):
+                            try:
+                                self.callback(json.loads(notification.payload))
+                            except Exception as e:
+                                print(f"Error handling notification: {e}")
+            except Exception as e:
+                print(f"Notification listener error: {e}")
+                self._stop_event.wait(5)
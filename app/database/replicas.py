@@ -0,0 +1,89 @@
+import itertools
+import threading
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# Zero when the replica has replayed everything it received (an idle primary
+# sends nothing, so the last replay timestamp alone would look like growing
+# lag); otherwise the age of the last replayed transaction. NULL off a standby.
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+class ReplicaRouter:
+    """Round-robin over read replicas, skipping any that lag too far behind
+
+    A background thread, started on first use, measures every replica's lag
+    each ``check_seconds``; requests only read the cached values, so a slow or
+    unreachable replica never holds up a read. A replica that cannot be
+    reached, or has not been measured yet, counts as infinitely behind. When
+    no replica is fresh enough, reads go to the primary.
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine], max_lag_seconds: float, check_seconds: float):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self._cycle = itertools.cycle(range(len(replicas)))
+        self._lags: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    def lag(self, index: int) -> float:
+        """Last measured replication lag of one replica in seconds"""
+        return self._lags.get(index, float('inf'))
+
+    def refresh(self):
+        """Measure every replica's lag now"""
+        for index, replica in enumerate(self.replicas):
+            self._lags[index] = self._measure(replica)
+
+    def start(self):
+        """Start the background lag checks, if replicas are configured and they are not running"""
+        with self._lock:
+            if not self.replicas or (self._refresher is not None and self._refresher.is_alive()):
+                return
+            self._stopped.clear()
+            self._refresher = threading.Thread(target=self._run, name="replica-lag", daemon=True)
+            self._refresher.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.refresh()
+            self._stopped.wait(self.check_seconds)
+
+    @staticmethod
+    def _measure(engine: Engine) -> float:
+        if engine.dialect.name != "postgresql":
+            return 0.0
+        try:
+            with engine.connect() as conn:
+                lag = conn.execute(LAG_QUERY).scalar()
+        except Exception as e:
+            print(f"Replica lag check failed: {e}")
+            return float('inf')
+        # NULL: not in recovery (or nothing replayed yet), so nothing to wait for
+        return float(lag or 0.0)
+
+    def read_engine(self) -> Engine:
+        """Next replica within the lag threshold, or the primary"""
+        if not self.replicas:
+            return self.primary
+        if self._refresher is None:
+            self.start()
+
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                index = next(self._cycle)
+                if self.lag(index) <= self.max_lag_seconds:
+                    return self.replicas[index]
+        return self.primary
@@ -1,7 +1,13 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from brotli_asgi import BrotliMiddleware
 from app.api import router
+from app.api.events import broadcaster
+from app.api.profiling import ProfilingMiddleware
 from app.config import settings
+from app.database import replica_router
 
 # Create FastAPI app
 app = FastAPI(
@@ -9,7 +15,20 @@ app = FastAPI(
     description="API for tracking popular n8n workflows across multiple platforms",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
+)
+
+# Opt-in request profiling for admin keys
+app.add_middleware(ProfilingMiddleware)
+
+# Response compression: brotli when accepted, gzip otherwise
+app.add_middleware(
+    BrotliMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_fallback=True,
+    # Event streams must reach the client as each event is written
+    excluded_handlers=["^/api/v1/stream"]
 )
 
 # CORS middleware
@@ -24,6 +43,16 @@ app.add_middleware(
 # Include API routes
 app.include_router(router)
 
+@app.on_event("startup")
+async def start_event_feed():
+    """Deliver collection events to stream subscribers on this worker"""
+    broadcaster.start(asyncio.get_running_loop())
+
+@app.on_event("shutdown")
+def stop_event_feed():
+    broadcaster.stop()
+    replica_router.stop()
+
 @app.get("/")
 def read_root():
     """Root endpoint"""
@@ -0,0 +1,78 @@
+import cProfile
+import io
+import json
+import pstats
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+CATEGORIES = ("http", "db", "sleep", "processing")
+
+# Path fragments of the modules whose own time counts as HTTP or database work
+_MODULES = (
+    ("http", ("/requests/", "/urllib3/", "/httplib2/", "/googleapiclient/", "/pytrends/",
+              "/http/client.py", "/socket.py", "/ssl.py")),
+    ("db", ("/sqlalchemy/", "/psycopg/", "/psycopg_binary/", "/psycopg2/")),
+)
+
+def _category(func: Tuple[str, int, str]) -> Optional[str]:
+    """Category of a profiled function, or None for C builtins (filename ``~``)"""
+    filename, _, name = func
+    if name == "<built-in method time.sleep>":
+        return "sleep"
+    path = filename.replace("\\", "/")
+    for category, fragments in _MODULES:
+        if any(fragment in path for fragment in fragments):
+            return category
+    return None if filename == "~" else "processing"
+
+def breakdown(stats: pstats.Stats) -> Dict[str, float]:
+    """Split total profiled time into HTTP, DB, sleep and processing seconds
+
+    Each function's own time goes to the category of its module. Builtins
+    (socket reads, ``select``) have no module, so their time is split across
+    their callers' categories: a socket read issued by urllib3 is HTTP time.
+    """
+    totals = dict.fromkeys(CATEGORIES, 0.0)
+    for func, (_, _, own_time, _, callers) in stats.stats.items():
+        category = _category(func)
+        if category is not None:
+            totals[category] += own_time
+        elif callers:
+            for caller, caller_stats in callers.items():
+                totals[_category(caller) or "processing"] += caller_stats[2]
+        else:
+            totals["processing"] += own_time
+    return {category: round(seconds, 6) for category, seconds in totals.items()}
+
+class Profile:
+    """cProfile session usable as a context manager, saved with its time breakdown"""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def __enter__(self) -> "Profile":
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.disable()
+
+    def stats(self) -> pstats.Stats:
+        return pstats.Stats(self.profiler)
+
+    def breakdown(self) -> Dict[str, float]:
+        return breakdown(self.stats())
+
+    def top(self, limit: int = 30, sort: str = "cumulative") -> str:
+        """Text report of the most expensive functions"""
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def save(self, path: Path) -> Dict[str, float]:
+        """Write ``path`` (pstats format, for snakeviz or ``pstats``) and a JSON breakdown beside it"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.profiler.dump_stats(str(path))
+        totals = self.breakdown()
+        path.with_suffix(".json").write_text(json.dumps(totals, indent=2))
+        return totals
@@ -1,3 +1,3 @@
-from .jobs import run_scheduler, collect_all_workflows
+from .jobs import run_scheduler, collect_all_workflows, export_metric_archive, refresh_priority_workflows
 
-__all__ = ['run_scheduler', 'collect_all_workflows']
+__all__ = ['run_scheduler', 'collect_all_workflows', 'export_metric_archive', 'refresh_priority_workflows']
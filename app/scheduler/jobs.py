@@ -1,10 +1,17 @@
 import logging
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
+from pathlib import Path
 from app.database import SessionLocal
-from app.collectors import YouTubeCollector, ForumCollector, TrendsCollector
+from app.database.models import CollectionLog
+from app.collectors import YouTubeCollector, ForumCollector, TrendsCollector, RawArchive, EntityCache
+from app.collectors.archive import new_run_id
 from app.config import settings
+from app.profiling import Profile
+from app.analytics import export_closed_months
+from .refresh import refresh_workflows
 
 # Configure logging
 logging.basicConfig(
@@ -13,13 +20,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def collect_all_workflows():
-    """Collect workflows from all platforms and countries"""
+def _save_unit_profile(db, collector, profile: Profile, path: Path):
+    """Write one unit's profile and link it from the unit's collection log"""
+    try:
+        totals = profile.save(path)
+        logger.info(
+            f"Profile {path}: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in totals.items())
+        )
+        if collector is not None and collector.log_id:
+            db.query(CollectionLog).filter(CollectionLog.id == collector.log_id).update(
+                {"profile_path": str(path)}
+            )
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error saving profile {path}: {e}")
+
+def collect_all_workflows(profile: bool = False):
+    """Collect workflows from all platforms and countries
+
+    With ``profile``, each platform/country unit runs under cProfile and its
+    profile is written to ``PROFILE_DIR/collections/<run>/``.
+    """
     db = SessionLocal()
     
     try:
         logger.info("Starting scheduled workflow collection...")
         
+        archive = RawArchive() if settings.raw_archive_enabled else None
+        if archive:
+            logger.info(f"Archiving raw responses for run {archive.run_id}")
+        cache = EntityCache()
+        profile_root = Path(settings.profile_dir) / "collections" / (archive.run_id if archive else new_run_id())
+        
         collectors = [
             ("YouTube", YouTubeCollector),
             ("Forum", ForumCollector),
@@ -28,15 +61,31 @@ def collect_all_workflows():
         
         for name, collector_class in collectors:
             for country in settings.country_list:
+                collector = None
+                unit_profile = Profile() if profile else None
                 try:
                     logger.info(f"Collecting {name} workflows for {country}...")
-                    collector = collector_class(db)
-                    workflows = collector.collect(country, settings.workflows_per_platform)
-                    logger.info(f"Collected {len(workflows)} {name} workflows for {country}")
+                    collector = collector_class(db, archive=archive, cache=cache)
+                    if unit_profile:
+                        with unit_profile:
+                            summary = collector.collect(country, settings.workflows_per_platform)
+                    else:
+                        summary = collector.collect(country, settings.workflows_per_platform)
+                    logger.info(
+                        f"Collected {summary['workflows_collected']} {name} workflows for {country} "
+                        f"({summary['new_workflows']} new)"
+                    )
                     
                 except Exception as e:
                     logger.error(f"Error collecting {name} for {country}: {e}")
+                finally:
+                    if unit_profile:
+                        _save_unit_profile(
+                            db, collector, unit_profile,
+                            profile_root / f"{name.lower().replace(' ', '-')}-{country}.prof"
+                        )
         
+        logger.info(f"Entity cache: {cache.hits} hits, {cache.misses} misses")
         logger.info("Scheduled collection completed successfully")
         
     except Exception as e:
@@ -44,8 +93,26 @@ def collect_all_workflows():
     finally:
         db.close()
 
-def run_scheduler():
-    """Run the scheduler"""
+def refresh_priority_workflows():
+    """Refresh stats of the highest-priority known workflows"""
+    try:
+        logger.info("Starting priority refresh...")
+        results = refresh_workflows()
+        logger.info(f"Priority refresh completed: {results}")
+    except Exception as e:
+        logger.error(f"Priority refresh failed: {e}")
+
+def export_metric_archive():
+    """Export closed months of metric history to the Parquet archive"""
+    try:
+        logger.info("Exporting closed months to the Parquet archive...")
+        exported = export_closed_months()
+        logger.info(f"Parquet export completed: {len(exported)} months written")
+    except Exception as e:
+        logger.error(f"Parquet export failed: {e}")
+
+def run_scheduler(profile: bool = False):
+    """Run the scheduler; ``profile`` profiles every scheduled collection"""
     
     if not settings.enable_scheduler:
         logger.warning("Scheduler is disabled in settings")
@@ -60,11 +127,31 @@ def run_scheduler():
     scheduler.add_job(
         collect_all_workflows,
         trigger=CronTrigger.from_crontab(settings.cron_schedule),
+        kwargs={'profile': profile},
         id='collect_workflows',
         name='Collect n8n workflows from all platforms',
         replace_existing=True
     )
     
+    # Add adaptive refresh job
+    if settings.enable_refresh:
+        scheduler.add_job(
+            refresh_priority_workflows,
+            trigger=IntervalTrigger(minutes=settings.refresh_interval_minutes),
+            id='refresh_workflows',
+            name='Refresh stats of high-priority workflows',
+            replace_existing=True
+        )
+    
+    # Add analytics archive job
+    scheduler.add_job(
+        export_metric_archive,
+        trigger=CronTrigger.from_crontab(settings.parquet_export_cron),
+        id='export_metric_archive',
+        name='Export closed months of metric history to Parquet',
+        replace_existing=True
+    )
+    
     logger.info("Scheduler started. Press Ctrl+C to exit.")
     
     try:
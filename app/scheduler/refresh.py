@@ -0,0 +1,132 @@
+import heapq
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.database.models import Workflow, PopularityMetric, snapshot_rank
+from app.collectors import YouTubeCollector, ForumCollector
+
+logger = logging.getLogger(__name__)
+
+# Platforms whose stats can be re-read by id; Trends is search-only
+REFRESHABLE = {
+    "youtube": YouTubeCollector,
+    "forum": ForumCollector
+}
+
+# platform -> platform_id -> countries tracking that item
+Targets = Dict[str, Dict[str, List[str]]]
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+class RefreshScheduler:
+    """Priority queue of known workflows keyed by recent change rate and staleness
+
+    Priority is ``(relative view change per hour + floor) * hours since last
+    read``: fast-moving items come back quickly, while dead threads only
+    resurface once they are very stale. Each run pops the queue until the
+    platform's budget is spent and refreshes stats by id, with no search cost.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def priorities(self, platforms: List[str]) -> Dict[Tuple[str, str], Tuple[float, List[str]]]:
+        """Priority and tracking countries per (platform, platform_id)"""
+        ranked = select(
+            PopularityMetric.workflow_id,
+            PopularityMetric.views,
+            PopularityMetric.collected_at,
+            func.coalesce(PopularityMetric.last_seen_at, PopularityMetric.collected_at).label('last_seen_at'),
+            snapshot_rank().label('rank')
+        ).subquery()
+
+        rows = self.db.execute(
+            select(
+                Workflow.id, Workflow.platform, Workflow.platform_id, Workflow.country,
+                ranked.c.views, ranked.c.collected_at, ranked.c.last_seen_at, ranked.c.rank
+            ).join(ranked, ranked.c.workflow_id == Workflow.id).where(
+                ranked.c.rank <= 2,
+                Workflow.platform.in_(platforms)
+            )
+        ).all()
+
+        snapshots: Dict[int, list] = {}
+        for workflow_id, platform, platform_id, country, views, collected_at, last_seen_at, rank in rows:
+            entry = snapshots.setdefault(workflow_id, [platform, platform_id, country, None, None])
+            entry[2 + rank] = (views or 0, _aware(collected_at), _aware(last_seen_at))
+
+        now = datetime.now(timezone.utc)
+        result: Dict[Tuple[str, str], Tuple[float, List[str]]] = {}
+        for platform, platform_id, country, latest, previous in snapshots.values():
+            if latest is None:
+                continue
+
+            # Unchanged re-reads only extend last_seen_at, which is when we last looked
+            staleness = max((now - latest[2]).total_seconds() / 3600, 0.0)
+            if previous is None:
+                rate = settings.refresh_default_rate
+            else:
+                hours = max((latest[1] - previous[1]).total_seconds() / 3600, 1.0)
+                rate = abs(latest[0] - previous[0]) / max(previous[0], 1) / hours
+
+            priority = (rate + settings.refresh_rate_floor) * staleness
+            key = (platform, platform_id)
+            best, countries = result.get(key, (0.0, []))
+            result[key] = (max(best, priority), countries + [country])
+
+        return result
+
+    def plan(self, budgets: Dict[str, int]) -> Targets:
+        """Pop the highest-priority items until each platform's item budget is used"""
+        queue = [
+            (-priority, platform, platform_id, countries)
+            for (platform, platform_id), (priority, countries) in self.priorities(list(budgets)).items()
+            if priority >= settings.refresh_min_priority
+        ]
+        heapq.heapify(queue)
+
+        targets: Targets = {platform: {} for platform in budgets}
+        remaining = dict(budgets)
+        while queue and any(remaining.values()):
+            _, platform, platform_id, countries = heapq.heappop(queue)
+            if remaining[platform] <= 0:
+                continue
+            targets[platform][platform_id] = countries
+            remaining[platform] -= 1
+
+        return targets
+
+def refresh_budgets() -> Dict[str, int]:
+    """Items each refresh run may re-read, sized to fit the daily quota"""
+    runs_per_day = max(1, (24 * 60) // max(1, settings.refresh_interval_minutes))
+    youtube_calls = settings.refresh_quota_per_day // (runs_per_day * settings.youtube_videos_cost)
+    return {
+        "youtube": youtube_calls * YouTubeCollector.MAX_IDS_PER_CALL,
+        "forum": settings.refresh_forum_topics_per_run
+    }
+
+def refresh_workflows(db: Optional[Session] = None) -> Dict[str, int]:
+    """Run one targeted stats refresh over the highest-priority known workflows"""
+    own_session = db is None
+    db = db or SessionLocal()
+    results = {}
+
+    try:
+        targets = RefreshScheduler(db).plan(refresh_budgets())
+        for platform, items in targets.items():
+            if not items:
+                continue
+            collector = REFRESHABLE[platform](db)
+            summary = collector.refresh(items)
+            results[platform] = summary['workflows_collected']
+            logger.info(f"Refreshed {summary['workflows_collected']} {platform} workflows")
+    finally:
+        if own_session:
+            db.close()
+
+    return results
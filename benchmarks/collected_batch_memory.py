@@ -0,0 +1,60 @@
+"""Compare peak memory of list-of-dicts items against CollectedBatch
+
+Run from the repository root:
+
+    python -m benchmarks.collected_batch_memory [items]
+"""
+import sys
+import tracemalloc
+from app.collectors.batch import CollectedBatch
+
+def _metrics(i: int) -> dict:
+    views = 1000 + i
+    likes = i % 97
+    comments = i % 13
+    return {
+        'views': views,
+        'likes': likes,
+        'comments': comments,
+        'like_to_view_ratio': round(likes / views, 6),
+        'comment_to_view_ratio': round(comments / views, 6),
+        'engagement_score': round((likes * 2 + comments * 5) / views, 4)
+    }
+
+def build_dicts(n: int) -> list:
+    return [
+        {
+            'workflow_name': f"n8n workflow video {i}",
+            'platform': 'youtube',
+            'platform_id': f"vid{i:08d}",
+            'country': 'US',
+            'metrics': _metrics(i)
+        }
+        for i in range(n)
+    ]
+
+def build_batch(n: int) -> CollectedBatch:
+    batch = CollectedBatch('youtube')
+    for i in range(n):
+        batch.append(f"n8n workflow video {i}", f"vid{i:08d}", 'US', **_metrics(i))
+    return batch
+
+def peak_bytes(builder, n: int) -> int:
+    tracemalloc.start()
+    result = builder(n)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    dict_peak = peak_bytes(build_dicts, n)
+    batch_peak = peak_bytes(build_batch, n)
+    print(f"items:           {n}")
+    print(f"list of dicts:   {dict_peak / 1e6:8.1f} MB")
+    print(f"CollectedBatch:  {batch_peak / 1e6:8.1f} MB")
+    print(f"reduction:       {1 - batch_peak / dict_peak:8.1%}")
+
+if __name__ == "__main__":
+    main()
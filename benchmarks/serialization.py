@@ -0,0 +1,71 @@
+"""Compare the ORM/pydantic response path against plain rows + orjson
+
+Run from the repository root:
+
+    python -m benchmarks.serialization
+"""
+import json
+import timeit
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from fastapi.encoders import jsonable_encoder
+from app.api.models import WorkflowListResponse
+from app.api.serialization import row_to_workflow, dumps
+
+def _orm_rows(n: int) -> list:
+    """Objects shaped like hydrated (Workflow, PopularityMetric) pairs"""
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i in range(n):
+        workflow = SimpleNamespace(id=i, workflow_name=f"n8n workflow {i}", platform='youtube', country='US')
+        metric = SimpleNamespace(
+            views=1000 + i, likes=i % 97, comments=i % 13,
+            like_to_view_ratio=Decimal('0.012345'), comment_to_view_ratio=Decimal('0.001234'),
+            engagement_score=Decimal('0.1234'), replies=None, participants=None,
+            search_volume=None, trend_direction=None, growth_percentage=None,
+            normalized_score=Decimal('0.812500'), collected_at=now
+        )
+        rows.append((workflow, metric))
+    return rows
+
+def _column_rows(n: int) -> list:
+    """Tuples shaped like ``WORKFLOW_COLUMNS`` rows"""
+    now = datetime.now(timezone.utc)
+    return [
+        (i, f"n8n workflow {i}", 'youtube', 'US', now, 1000 + i, i % 97, i % 13,
+         0.012345, 0.001234, 0.1234, None, None, None, None, None, 0.8125)
+        for i in range(n)
+    ]
+
+def current_path(rows: list) -> bytes:
+    """Dicts holding ORM objects -> response_model validation -> jsonable_encoder -> json"""
+    content = {
+        "total": len(rows), "limit": len(rows), "offset": 0,
+        "workflows": [
+            {"workflow_id": w.id, "workflow": w.workflow_name, "platform": w.platform,
+             "popularity_metrics": m, "country": w.country, "collected_at": m.collected_at}
+            for w, m in rows
+        ]
+    }
+    validated = WorkflowListResponse.model_validate(content)
+    return json.dumps(jsonable_encoder(validated), separators=(',', ':')).encode('utf-8')
+
+def fast_path(rows: list) -> bytes:
+    """Plain column tuples -> dicts -> orjson"""
+    return dumps({
+        "total": len(rows), "limit": len(rows), "offset": 0,
+        "workflows": [row_to_workflow(row) for row in rows]
+    })
+
+def main():
+    for n in (100, 10000):
+        orm_rows, column_rows = _orm_rows(n), _column_rows(n)
+        repeat = max(1, 20000 // n)
+        current = min(timeit.repeat(lambda: current_path(orm_rows), number=repeat, repeat=3)) / repeat
+        fast = min(timeit.repeat(lambda: fast_path(column_rows), number=repeat, repeat=3)) / repeat
+        print(f"{n:>6} rows  current: {current * 1000:8.2f} ms  fast: {fast * 1000:8.2f} ms  "
+              f"speedup: {current / fast:5.1f}x")
+
+if __name__ == "__main__":
+    main()
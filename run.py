@@ -2,13 +2,66 @@ import sys
 import uvicorn
 from app.config import settings
 
+def _flag_values(flag: str) -> list:
+    """Return the positional values that follow a command-line flag"""
+    if flag not in sys.argv:
+        return []
+    values = []
+    for arg in sys.argv[sys.argv.index(flag) + 1:]:
+        if arg.startswith("--"):
+            break
+        values.append(arg)
+    return values
+
 def main():
     """Main application runner"""
     
     if "--scheduler-only" in sys.argv:
         # Run scheduler only (implemented in Phase 5)
         from app.scheduler import run_scheduler
-        run_scheduler()
+        run_scheduler(profile="--profile" in sys.argv)
+    elif "--collect" in sys.argv:
+        # Run one full collection now, profiling each unit with --profile
+        from app.scheduler import collect_all_workflows
+        collect_all_workflows(profile="--profile" in sys.argv)
+    elif "--replay" in sys.argv:
+        # Re-run processing and persistence for one archived run, offline
+        from app.collectors.replay import replay_run
+        for run_id in _flag_values("--replay"):
+            print(f"Run {run_id}: {replay_run(run_id)}")
+    elif "--reprocess" in sys.argv:
+        # Replay archived runs (all of them when none are given) across a process pool
+        from app.collectors.replay import reprocess_runs
+        workers = _flag_values("--workers")
+        results = reprocess_runs(
+            run_ids=_flag_values("--reprocess") or None,
+            workers=int(workers[0]) if workers else None
+        )
+        print(f"Reprocessed {sum(results.values())} workflows from {len(results)} archived units")
+    elif "--refresh" in sys.argv:
+        # Run one priority refresh of known workflows now
+        from app.scheduler import refresh_priority_workflows
+        refresh_priority_workflows()
+    elif "--import" in sys.argv:
+        # Bulk-load historical snapshots from NDJSON/CSV/Parquet files or directories
+        import logging
+        from app.collectors.importer import import_files
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        workers = _flag_values("--workers")
+        totals = import_files(
+            _flag_values("--import"),
+            workers=int(workers[0]) if workers else None
+        )
+        print(f"Import: {totals}")
+    elif "--rebuild-scores" in sys.argv:
+        # Rebuild the score sketches from stored snapshots and backfill normalized scores
+        from app.collectors.quantiles import rebuild_scores
+        counts = rebuild_scores()
+        print(f"Rebuilt {len(counts)} score sketches from {sum(counts.values())} snapshots")
+    elif "--export-archive" in sys.argv:
+        # Export closed months of metric history to Parquet now
+        from app.scheduler import export_metric_archive
+        export_metric_archive()
     else:
         # Run API server
         uvicorn.run(
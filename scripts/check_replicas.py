@@ -0,0 +1,117 @@
+"""Check read-replica routing against a local primary and streaming standby
+
+Start a primary and a standby (e.g. ``pg_basebackup -R``) on two ports, set
+``DATABASE_URL`` to the primary and ``READ_REPLICA_URLS`` to the standby,
+then run from the repository root:
+
+    python -m scripts.check_replicas
+
+Checks that reads alternate between fresh replicas, that an unreachable
+replica is skipped without delaying reads, and that a replica whose replay
+is paused falls back to the primary once its lag passes the threshold.
+Pausing replay needs a superuser on the standby; that check is skipped
+otherwise. Exits non-zero when a check fails.
+"""
+import sys
+import time
+from collections import Counter
+from sqlalchemy import text
+from app.config import settings
+from app.database.database import _create_engine
+from app.database.replicas import ReplicaRouter
+
+CHECK_SECONDS = 0.5
+MAX_LAG_SECONDS = 1.0
+
+def _server(engine) -> str:
+    """host:port of the server an engine connects to, as the server reports it"""
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT inet_server_addr() || ':' || inet_server_port()")).scalar()
+
+def _route(router: ReplicaRouter, reads: int) -> Counter:
+    return Counter(_server(router.read_engine()) for _ in range(reads))
+
+def _wait_for(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(CHECK_SECONDS / 2)
+    return False
+
+def check_round_robin(primary, standby) -> bool:
+    """The same standby listed twice is two replicas; reads should split evenly"""
+    router = ReplicaRouter(primary, [standby, _create_engine(settings.read_replica_url_list[0])],
+                           MAX_LAG_SECONDS, CHECK_SECONDS)
+    router.refresh()
+    engines = [router.read_engine() for _ in range(10)]
+    router.stop()
+    ok = engines[0::2] == [router.replicas[0]] * 5 and engines[1::2] == [router.replicas[1]] * 5
+    print(f"round robin: {'ok' if ok else 'FAILED'} ({_route(router, 4)})")
+    return ok
+
+def check_unreachable(primary, standby) -> bool:
+    """A replica that cannot be reached is skipped, and reads never wait for its lag check"""
+    dead = _create_engine("postgresql+psycopg://postgres@10.255.255.1:5432/postgres")
+    router = ReplicaRouter(primary, [dead, standby], MAX_LAG_SECONDS, CHECK_SECONDS)
+    router.start()
+    _wait_for(lambda: router.lag(1) <= MAX_LAG_SECONDS, settings.database_connect_timeout * 2)
+
+    started = time.monotonic()
+    engines = {router.read_engine() for _ in range(20)}
+    elapsed = time.monotonic() - started
+    router.stop()
+
+    ok = engines == {standby} and elapsed < 0.1
+    print(f"unreachable replica: {'ok' if ok else 'FAILED'} "
+          f"(engines: {len(engines)}, 20 picks in {elapsed * 1000:.1f} ms)")
+    return ok
+
+def check_lag_fallback(primary, standby) -> bool:
+    """Pause replay on the standby, write on the primary, and expect reads on the primary"""
+    try:
+        with standby.connect() as conn:
+            conn.execute(text("SELECT pg_wal_replay_pause()"))
+            conn.commit()
+    except Exception as e:
+        print(f"lag fallback: skipped ({e.__class__.__name__}: cannot pause replay)")
+        return True
+
+    router = ReplicaRouter(primary, [standby], MAX_LAG_SECONDS, CHECK_SECONDS)
+    try:
+        with primary.begin() as conn:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS replica_check (at TIMESTAMPTZ)"))
+            conn.execute(text("INSERT INTO replica_check VALUES (now())"))
+        router.start()
+        fell_back = _wait_for(lambda: router.read_engine() is primary, MAX_LAG_SECONDS + 5)
+    finally:
+        with standby.connect() as conn:
+            conn.execute(text("SELECT pg_wal_replay_resume()"))
+            conn.commit()
+
+    recovered = _wait_for(lambda: router.read_engine() is standby, MAX_LAG_SECONDS + 5)
+    router.stop()
+    with primary.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS replica_check"))
+
+    ok = fell_back and recovered
+    print(f"lag fallback: {'ok' if ok else 'FAILED'} (fell back: {fell_back}, recovered: {recovered})")
+    return ok
+
+def main():
+    if not settings.read_replica_url_list:
+        sys.exit("Set READ_REPLICA_URLS to the standby")
+
+    primary = _create_engine(settings.database_url)
+    standby = _create_engine(settings.read_replica_url_list[0])
+    print(f"primary {_server(primary)}, standby {_server(standby)}")
+
+    results = [
+        check_round_robin(primary, standby),
+        check_unreachable(primary, standby),
+        check_lag_fallback(primary, standby),
+    ]
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()